@@ -45,6 +45,8 @@ class ApplicationSettings(BaseSettings):
     non_max_suppression_threshold: float = 0.45
     enable_gpu_acceleration: bool = True
     model_cache_directory: str = "./models"
+    persist_annotated_images: bool = True
+    annotated_image_jpeg_quality: int = 80
 
     # Traffic Management Settings
     default_green_signal_duration: int = 30  # seconds
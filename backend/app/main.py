@@ -3,13 +3,16 @@ High-performance web API with real-time vehicle detection and traffic optimizati
 """
 
 import asyncio
+import inspect
 import uuid
 import psutil
 import time
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
+
+import numpy as np
 
 from fastapi import (
     FastAPI, File, UploadFile, WebSocket, WebSocketDisconnect,
@@ -18,7 +21,7 @@ from fastapi import (
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.security import HTTPBearer
 
 # Import core modules
@@ -70,6 +73,31 @@ security_manager = SecurityManager()
 # Application start time for uptime calculation
 app_start_time = time.time()
 
+# Health score thresholds: < 0.5 unhealthy, [0.5, 0.8) degraded, >= 0.8 healthy
+HEALTH_STATUS_LABELS = np.array(["unhealthy", "degraded", "healthy"])
+HEALTH_STATUS_THRESHOLDS = np.array([0.5, 0.8])
+
+
+def classify_health_status(health_score: Union[float, np.ndarray]) -> Union[str, np.ndarray]:
+    """Classify one health score, or an array of scores, into status labels"""
+    labels = HEALTH_STATUS_LABELS[
+        np.searchsorted(HEALTH_STATUS_THRESHOLDS, health_score, side="right")
+    ]
+    return labels if np.ndim(labels) else str(labels)
+
+
+# Health timestamps are reformatted at most once per second
+_health_timestamp_cache = {"second": None, "iso": ""}
+
+
+def get_health_timestamp() -> str:
+    """Current UTC time as an ISO string, cached at one-second resolution"""
+    second = int(time.time())
+    if _health_timestamp_cache["second"] != second:
+        _health_timestamp_cache["second"] = second
+        _health_timestamp_cache["iso"] = datetime.fromtimestamp(second, timezone.utc).isoformat()
+    return _health_timestamp_cache["iso"]
+
 
 class ConnectionManager:
     """Manages WebSocket connections for real-time updates"""
@@ -272,6 +300,17 @@ async def get_analytics_service() -> Optional[TrafficAnalyticsService]:
     return analytics_service
 
 
+async def check_service_ready(service) -> bool:
+    """Probe a service's readiness, awaiting is_ready() if it is async"""
+    if not service:
+        return False
+    
+    ready = service.is_ready()
+    if inspect.isawaitable(ready):
+        ready = await ready
+    return bool(ready)
+
+
 # Metrics endpoint
 @app.get("/metrics")
 async def metrics_endpoint():
@@ -470,7 +509,7 @@ async def emergency_override(
         )
 
 
-@app.get("/health")
+@app.get("/health", response_class=ORJSONResponse)
 async def health_check():
     """Comprehensive health check endpoint"""
     try:
@@ -488,11 +527,19 @@ async def health_check():
             memory_percent = 0.0
             memory_bytes = 0
         
-        # Check service health
+        # Check service health - probes run concurrently, a failing probe counts as not ready
+        probed_services = {
+            "vehicle_detector": vehicle_detector,
+            "traffic_manager": traffic_manager,
+            "analytics": analytics_service
+        }
+        probe_results = await asyncio.gather(
+            *(check_service_ready(service) for service in probed_services.values()),
+            return_exceptions=True
+        )
         services = {
-            "vehicle_detector": vehicle_detector.is_ready() if vehicle_detector else False,
-            "traffic_manager": traffic_manager.is_ready() if traffic_manager else False,
-            "analytics": analytics_service.is_ready() if analytics_service else False
+            name: result is True
+            for name, result in zip(probed_services, probe_results)
         }
         
         # Calculate health score
@@ -501,16 +548,11 @@ async def health_check():
         health_score = (healthy_services / total_services) if total_services > 0 else 0.0
         
         # Determine overall status
-        if health_score >= 0.8:
-            overall_status = "healthy"
-        elif health_score >= 0.5:
-            overall_status = "degraded"
-        else:
-            overall_status = "unhealthy"
+        overall_status = classify_health_status(health_score)
         
         return {
             "status": overall_status,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": get_health_timestamp(),
             "uptime_seconds": uptime_seconds,
             "health_score": health_score,
             "services": services,
@@ -529,7 +571,7 @@ async def health_check():
         return {
             "status": "unhealthy",
             "error": str(error),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": get_health_timestamp(),
             "version": settings.application_version
         }
 
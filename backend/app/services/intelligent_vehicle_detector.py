@@ -5,18 +5,29 @@ Handles real-time vehicle detection and traffic analysis
 
 import asyncio
 import time
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from PIL import Image, ImageDraw, ImageFont
 
 from ..core.config import settings
 from ..core.logger import LoggerMixin
 from ..models.traffic_models import VehicleDetectionResult, DetectedVehicle
 
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+
+
+@dataclass
+class DetectorPerformanceMetrics:
+    """Running detector performance counters"""
+    total_detections: int = 0
+    average_inference_time: float = 0.0
+    last_detection_time: Optional[float] = None
+
 
 class IntelligentVehicleDetector(LoggerMixin):
     """Modern vehicle detection service using YOLOv8"""
@@ -29,6 +40,10 @@ class IntelligentVehicleDetector(LoggerMixin):
         7: 'truck'
     }
     
+    # COCO class id -> vehicle name lookup table, '' for non-vehicle classes
+    _CLASS_NAME_LUT = np.full(80, '', dtype=object)
+    _CLASS_NAME_LUT[list(VEHICLE_CLASSES)] = list(VEHICLE_CLASSES.values())
+    
     # Lane detection zones (normalized coordinates)
     LANE_ZONES = {
         'north': {'x_min': 0.45, 'x_max': 0.55, 'y_min': 0.0, 'y_max': 0.45},
@@ -39,13 +54,19 @@ class IntelligentVehicleDetector(LoggerMixin):
     
     def __init__(self):
         super().__init__()
-        self.model: Optional[YOLO] = None
+        self.model: Optional["YOLO"] = None
         self.model_initialized = False
-        self.performance_metrics = {
-            'total_detections': 0,
-            'average_inference_time': 0.0,
-            'last_detection_time': None
-        }
+        self.performance_metrics = DetectorPerformanceMetrics()
+        
+        # Lane zone bounds as arrays for batched lane assignment;
+        # index -1 of the label table maps to 'unknown'
+        self._zone_names = np.array(list(self.LANE_ZONES.keys()))
+        self._zone_bounds = np.array([
+            [zone['x_min'], zone['x_max'], zone['y_min'], zone['y_max']]
+            for zone in self.LANE_ZONES.values()
+        ])
+        self._lane_labels = np.append(self._zone_names, 'unknown')
+        self._lane_positions = {lane: index for index, lane in enumerate(self.LANE_ZONES)}
     
     async def initialize(self) -> None:
         """Initialize the YOLOv8 model asynchronously"""
@@ -58,7 +79,7 @@ class IntelligentVehicleDetector(LoggerMixin):
             model_path.mkdir(parents=True, exist_ok=True)
             
             # Initialize model in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             self.model = await loop.run_in_executor(
                 None, 
                 self._load_model
@@ -77,8 +98,11 @@ class IntelligentVehicleDetector(LoggerMixin):
             self.log_error_with_context(error, "model_initialization")
             raise
     
-    def _load_model(self) -> YOLO:
+    def _load_model(self) -> "YOLO":
         """Load YOLOv8 model (runs in thread pool)"""
+        # Imported here so importing this module does not pull in torch
+        from ultralytics import YOLO
+        
         model_file = Path(settings.model_cache_directory) / settings.model_name
         
         if model_file.exists():
@@ -109,8 +133,10 @@ class IntelligentVehicleDetector(LoggerMixin):
             results = await self._run_detection(image)
             
             # Process results
-            detected_vehicles = self._process_detection_results(results, image.shape)
-            lane_counts = self._count_vehicles_by_lane(detected_vehicles)
+            detected_vehicles, lane_indices = self._process_detection_results(
+                results, image.shape
+            )
+            lane_counts = self._count_vehicles_by_lane(lane_indices)
             
             # Save annotated image if requested
             annotated_image_path = None
@@ -146,7 +172,7 @@ class IntelligentVehicleDetector(LoggerMixin):
     
     async def _run_detection(self, image: np.ndarray) -> List:
         """Run YOLOv8 detection on image"""
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         return await loop.run_in_executor(
             None,
             lambda: self.model(
@@ -161,113 +187,113 @@ class IntelligentVehicleDetector(LoggerMixin):
         self, 
         results: List, 
         image_shape: Tuple[int, int, int]
-    ) -> List[DetectedVehicle]:
-        """Process YOLOv8 detection results into DetectedVehicle objects"""
+    ) -> Tuple[List[DetectedVehicle], np.ndarray]:
+        """Process YOLOv8 detection results into DetectedVehicle objects and lane indices"""
         detected_vehicles = []
+        lane_indices = []
         height, width = image_shape[:2]
         
         for result in results:
             boxes = result.boxes
             if boxes is None:
                 continue
-                
-            for box in boxes:
-                # Get class ID and confidence
-                class_id = int(box.cls.item())
-                confidence = float(box.conf.item())
-                
-                # Only process vehicle classes
-                if class_id not in self.VEHICLE_CLASSES:
-                    continue
-                
-                # Get bounding box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                
-                # Normalize coordinates
-                center_x = ((x1 + x2) / 2) / width
-                center_y = ((y1 + y2) / 2) / height
-                
-                # Determine lane
-                lane = self._determine_vehicle_lane(center_x, center_y)
-                
-                vehicle = DetectedVehicle(
-                    vehicle_type=self.VEHICLE_CLASSES[class_id],
+            
+            # One device->host transfer for the whole batch, no per-box .item() syncs
+            if hasattr(boxes, 'cpu'):
+                boxes = boxes.cpu().numpy()
+            class_ids = np.asarray(boxes.cls).astype(np.int32)
+            confidences = np.asarray(boxes.conf, dtype=np.float64)
+            coordinates = np.asarray(boxes.xyxy, dtype=np.float64).reshape(-1, 4)
+            
+            # Only process vehicle classes; ids outside the table map to entry 0 ('')
+            in_table = (class_ids >= 0) & (class_ids < self._CLASS_NAME_LUT.size)
+            vehicle_types = self._CLASS_NAME_LUT[np.where(in_table, class_ids, 0)]
+            is_vehicle = vehicle_types != ''
+            vehicle_types = vehicle_types[is_vehicle]
+            confidences = confidences[is_vehicle]
+            coordinates = coordinates[is_vehicle]
+            
+            # Normalized centers and lanes for all vehicles in one pass
+            centers_x = (coordinates[:, 0] + coordinates[:, 2]) * 0.5 / width
+            centers_y = (coordinates[:, 1] + coordinates[:, 3]) * 0.5 / height
+            result_lane_indices = self._lane_indices(centers_x, centers_y)
+            lanes = self._lane_labels[result_lane_indices]
+            lane_indices.append(result_lane_indices)
+            
+            # DetectedVehicle objects are only built at the API boundary
+            for vehicle_type, confidence, (x1, y1, x2, y2), center_x, center_y, lane in zip(
+                vehicle_types.tolist(), confidences.tolist(), coordinates.astype(int).tolist(),
+                centers_x.tolist(), centers_y.tolist(), lanes.tolist()
+            ):
+                detected_vehicles.append(DetectedVehicle(
+                    vehicle_type=vehicle_type,
                     confidence=confidence,
-                    bounding_box={
-                        'x1': int(x1), 'y1': int(y1),
-                        'x2': int(x2), 'y2': int(y2)
-                    },
+                    bounding_box={'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
                     center_coordinates={'x': center_x, 'y': center_y},
                     lane=lane
-                )
-                
-                detected_vehicles.append(vehicle)
+                ))
         
-        return detected_vehicles
+        lane_indices = np.concatenate(lane_indices) if lane_indices else np.empty(0, dtype=int)
+        return detected_vehicles, lane_indices
     
     def _determine_vehicle_lane(self, center_x: float, center_y: float) -> str:
         """Determine which lane a vehicle belongs to based on position"""
-        for lane, zone in self.LANE_ZONES.items():
-            if (zone['x_min'] <= center_x <= zone['x_max'] and 
-                zone['y_min'] <= center_y <= zone['y_max']):
-                return lane
-        return 'unknown'
+        return str(self._determine_vehicle_lanes(
+            np.array([center_x]), np.array([center_y])
+        )[0])
+    
+    def _determine_vehicle_lanes(
+        self, 
+        center_x: np.ndarray, 
+        center_y: np.ndarray
+    ) -> np.ndarray:
+        """Determine lanes for a batch of normalized vehicle centers"""
+        return self._lane_labels[self._lane_indices(center_x, center_y)]
     
-    def _count_vehicles_by_lane(self, vehicles: List[DetectedVehicle]) -> Dict[str, int]:
-        """Count vehicles in each lane"""
-        lane_counts = {'north': 0, 'south': 0, 'east': 0, 'west': 0}
+    def _lane_indices(self, center_x: np.ndarray, center_y: np.ndarray) -> np.ndarray:
+        """Index into LANE_ZONES for each center, -1 if outside all zones"""
+        center_x = np.asarray(center_x, dtype=np.float64)[:, None]
+        center_y = np.asarray(center_y, dtype=np.float64)[:, None]
+        x_min, x_max, y_min, y_max = self._zone_bounds.T
         
-        for vehicle in vehicles:
-            if vehicle.lane in lane_counts:
-                lane_counts[vehicle.lane] += 1
+        in_zone = (
+            (center_x >= x_min) & (center_x <= x_max) &
+            (center_y >= y_min) & (center_y <= y_max)
+        )
+        # argmax picks the first matching zone, mirroring LANE_ZONES order
+        indices = in_zone.argmax(axis=1)
+        indices[~in_zone.any(axis=1)] = -1
+        return indices
+    
+    def _count_vehicles_by_lane(
+        self, 
+        lane_indices: Union[np.ndarray, List[DetectedVehicle]]
+    ) -> Dict[str, int]:
+        """Count vehicles in each lane from lane indices (or DetectedVehicle objects)"""
+        if not isinstance(lane_indices, np.ndarray):
+            lane_indices = np.array(
+                [self._lane_positions.get(vehicle.lane, -1) for vehicle in lane_indices],
+                dtype=np.int8
+            )
         
-        return lane_counts
+        counts = np.bincount(
+            lane_indices[lane_indices >= 0], 
+            minlength=len(self._zone_names)
+        )
+        return dict(zip(self._zone_names.tolist(), counts.tolist()))
     
     async def _save_annotated_image(
         self, 
         image: np.ndarray, 
         vehicles: List[DetectedVehicle], 
         original_path: str
-    ) -> str:
-        """Save image with vehicle detection annotations"""
+    ) -> Optional[str]:
+        """Save image with vehicle detection annotations if persistence is enabled"""
+        if not settings.persist_annotated_images:
+            return None
+        
         try:
-            # Convert to PIL for better text rendering
-            pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-            draw = ImageDraw.Draw(pil_image)
-            
-            # Try to load a font, fall back to default if not available
-            try:
-                font = ImageFont.truetype("arial.ttf", 16)
-            except OSError:
-                font = ImageFont.load_default()
-            
-            # Color mapping for vehicle types
-            colors = {
-                'car': 'red',
-                'truck': 'blue', 
-                'bus': 'green',
-                'motorcycle': 'orange'
-            }
-            
-            for vehicle in vehicles:
-                bbox = vehicle.bounding_box
-                color = colors.get(vehicle.vehicle_type, 'yellow')
-                
-                # Draw bounding box
-                draw.rectangle(
-                    [(bbox['x1'], bbox['y1']), (bbox['x2'], bbox['y2'])],
-                    outline=color,
-                    width=2
-                )
-                
-                # Draw label
-                label = f"{vehicle.vehicle_type} ({vehicle.confidence:.2f})"
-                draw.text(
-                    (bbox['x1'], bbox['y1'] - 20),
-                    label,
-                    fill=color,
-                    font=font
-                )
+            encoded_image = self._encode_annotated_image(image, vehicles)
             
             # Save annotated image
             output_dir = Path("./output_images")
@@ -275,10 +301,7 @@ class IntelligentVehicleDetector(LoggerMixin):
             
             original_name = Path(original_path).stem
             output_path = output_dir / f"{original_name}_annotated.jpg"
-            
-            # Convert back to BGR for OpenCV
-            annotated_cv2 = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-            cv2.imwrite(str(output_path), annotated_cv2)
+            output_path.write_bytes(encoded_image)
             
             return str(output_path)
             
@@ -286,17 +309,71 @@ class IntelligentVehicleDetector(LoggerMixin):
             self.log_error_with_context(error, "save_annotated_image")
             return None
     
+    def _encode_annotated_image(
+        self, 
+        image: np.ndarray, 
+        vehicles: List[DetectedVehicle]
+    ) -> bytes:
+        """Draw vehicle detection annotations and encode the image as JPEG bytes"""
+        # Convert to PIL for better text rendering
+        pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        draw = ImageDraw.Draw(pil_image)
+        
+        # Try to load a font, fall back to default if not available
+        try:
+            font = ImageFont.truetype("arial.ttf", 16)
+        except OSError:
+            font = ImageFont.load_default()
+        
+        # Color mapping for vehicle types
+        colors = {
+            'car': 'red',
+            'truck': 'blue', 
+            'bus': 'green',
+            'motorcycle': 'orange'
+        }
+        
+        for vehicle in vehicles:
+            bbox = vehicle.bounding_box
+            color = colors.get(vehicle.vehicle_type, 'yellow')
+            
+            # Draw bounding box
+            draw.rectangle(
+                [(bbox['x1'], bbox['y1']), (bbox['x2'], bbox['y2'])],
+                outline=color,
+                width=2
+            )
+            
+            # Draw label
+            label = f"{vehicle.vehicle_type} ({vehicle.confidence:.2f})"
+            draw.text(
+                (bbox['x1'], bbox['y1'] - 20),
+                label,
+                fill=color,
+                font=font
+            )
+        
+        # Convert back to BGR for OpenCV and encode in memory
+        annotated_cv2 = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+        success, buffer = cv2.imencode(
+            '.jpg', 
+            annotated_cv2, 
+            [cv2.IMWRITE_JPEG_QUALITY, settings.annotated_image_jpeg_quality]
+        )
+        if not success:
+            raise ValueError("Could not encode annotated image")
+        
+        return buffer.tobytes()
+    
     def _update_performance_metrics(self, inference_time: float) -> None:
         """Update performance metrics"""
-        self.performance_metrics['total_detections'] += 1
-        self.performance_metrics['last_detection_time'] = time.time()
-        
-        # Calculate rolling average
-        current_avg = self.performance_metrics['average_inference_time']
-        total_detections = self.performance_metrics['total_detections']
+        metrics = self.performance_metrics
+        metrics.total_detections += 1
+        metrics.last_detection_time = time.time()
         
-        self.performance_metrics['average_inference_time'] = (
-            (current_avg * (total_detections - 1) + inference_time) / total_detections
+        # Incremental rolling average
+        metrics.average_inference_time += (
+            (inference_time - metrics.average_inference_time) / metrics.total_detections
         )
     
     def is_ready(self) -> bool:
@@ -305,7 +382,7 @@ class IntelligentVehicleDetector(LoggerMixin):
     
     def get_performance_metrics(self) -> Dict:
         """Get current performance metrics"""
-        return self.performance_metrics.copy()
+        return asdict(self.performance_metrics)
     
     async def cleanup(self) -> None:
         """Cleanup resources"""
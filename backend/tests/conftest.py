@@ -0,0 +1,25 @@
+"""
+Shared pytest fixtures for the backend test suite
+"""
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def test_output_dir(tmp_path_factory):
+    """Session-wide directory for generated test artifacts"""
+    return tmp_path_factory.mktemp("test_output")
+
+
+@pytest.fixture(scope="session")
+def shared_client():
+    """One TestClient reused for the whole session, so repeated requests skip client setup.
+
+    Requests are dispatched in-process to the ASGI app: no sockets or connection
+    pooling are involved, so this does not model a production HTTP client.
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+    
+    # Not used as a context manager: that would run the lifespan and load the model
+    return TestClient(app)
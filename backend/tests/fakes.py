@@ -0,0 +1,22 @@
+"""
+Lightweight stand-ins for ultralytics result objects, shared by the detector tests
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+
+@dataclass
+class FakeBoxes:
+    """Lightweight stand-in for ultralytics Boxes holding plain arrays"""
+    cls: np.ndarray
+    conf: np.ndarray
+    xyxy: np.ndarray
+
+
+@dataclass
+class FakeResult:
+    """Lightweight stand-in for an ultralytics Results object"""
+    boxes: Optional[FakeBoxes]
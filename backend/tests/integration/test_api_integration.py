@@ -5,6 +5,9 @@ import requests
 import time
 from pathlib import Path
 
+# Every test here talks to a running server, so CI deselects them with -m "not integration".
+pytestmark = pytest.mark.integration
+
 # Base URL for integration tests
 BASE_URL = "http://localhost:8000"
 
@@ -3,8 +3,9 @@ Tests for Intelligent Vehicle Detector
 Comprehensive testing of YOLOv8 vehicle detection functionality
 """
 
+from dataclasses import replace
+
 import pytest
-import asyncio
 from unittest.mock import Mock, patch
 from pathlib import Path
 import cv2
@@ -13,24 +14,36 @@ import numpy as np
 from app.services.intelligent_vehicle_detector import IntelligentVehicleDetector
 from app.models.traffic_models import VehicleDetectionResult, DetectedVehicle, LaneDirection
 from app.core.config import settings
+from tests.fakes import FakeBoxes, FakeResult
 
 
 class TestIntelligentVehicleDetector:
     """Test suite for IntelligentVehicleDetector"""
     
-    @pytest.fixture
-    async def detector(self):
-        """Create detector instance for testing"""
+    @pytest.fixture(scope="module")
+    def detector(self):
+        """Create one detector instance shared by the whole module"""
         detector = IntelligentVehicleDetector()
         # Mock the model initialization to avoid downloading YOLO weights
         with patch.object(detector, '_load_model'):
             detector.model = Mock()
             detector.model_initialized = True
             yield detector
-    
-    @pytest.fixture
+
+    @pytest.fixture(autouse=True)
+    def restore_detector_state(self, detector):
+        """Undo per-test mutations of the shared detector"""
+        model = detector.model
+        performance_metrics = replace(detector.performance_metrics)
+        yield
+        model.reset_mock(return_value=True, side_effect=True)
+        detector.model = model
+        detector.model_initialized = True
+        detector.performance_metrics = performance_metrics
+
+    @pytest.fixture(scope="session")
     def sample_image(self, test_output_dir):
-        """Create a sample test image"""
+        """Create a sample test image once per session"""
         # Create a simple test image
         image = np.zeros((640, 640, 3), dtype=np.uint8)
         # Add some colored rectangles to simulate vehicles
@@ -56,58 +69,94 @@ class TestIntelligentVehicleDetector:
         detector.model_initialized = False
         assert not detector.is_ready()
     
-    async def test_analyze_intersection_image_mock(self, detector, sample_image):
+    @pytest.fixture
+    def blank_image_path(self, monkeypatch):
+        """Fake image path served by a patched cv2.imread returning a blank frame"""
+        monkeypatch.setattr(cv2, "imread", lambda path: np.zeros((640, 640, 3), dtype=np.uint8))
+        return "fake_path.jpg"
+    
+    @pytest.mark.parametrize("image_fixture", ["sample_image", "blank_image_path"])
+    async def test_analyze_intersection_image_mock(self, detector, image_fixture, request, tmp_path, monkeypatch):
         """Test vehicle detection with mocked YOLO results"""
-        # Mock YOLO detection results
-        mock_result = Mock()
-        mock_boxes = Mock()
-        
-        # Simulate two vehicle detections
-        mock_boxes.cls = [Mock(), Mock()]
-        mock_boxes.cls[0].item.return_value = 2  # Car class
-        mock_boxes.cls[1].item.return_value = 7  # Truck class
+        monkeypatch.chdir(tmp_path)
+        image_path = request.getfixturevalue(image_fixture)
         
-        mock_boxes.conf = [Mock(), Mock()]
-        mock_boxes.conf[0].item.return_value = 0.85
-        mock_boxes.conf[1].item.return_value = 0.72
-        
-        mock_boxes.xyxy = [Mock(), Mock()]
-        mock_boxes.xyxy[0].tolist.return_value = [100, 100, 200, 180]
-        mock_boxes.xyxy[1].tolist.return_value = [300, 300, 400, 380]
-        
-        mock_result.boxes = mock_boxes
-        detector.model.return_value = [mock_result]
+        # Simulate a car, a truck and a non-vehicle (person) that must be dropped
+        detector.model.return_value = [
+            FakeResult(FakeBoxes(
+                cls=np.array([2, 7, 0]),
+                conf=np.array([0.85, 0.72, 0.9]),
+                xyxy=np.array([[100, 100, 200, 180], [300, 300, 400, 380], [10, 10, 40, 90]])
+            ))
+        ]
         
         # Test detection
-        result = await detector.analyze_intersection_image(sample_image)
+        result = await detector.analyze_intersection_image(image_path)
         
         assert isinstance(result, VehicleDetectionResult)
         assert result.total_vehicles == 2
         assert len(result.detected_vehicles) == 2
-        assert result.image_path == sample_image
+        assert result.image_path == image_path
         assert result.processing_time > 0
+        
+        car, truck = result.detected_vehicles
+        assert car.vehicle_type == 'car'
+        assert car.confidence == pytest.approx(0.85)
+        assert car.bounding_box == {'x1': 100, 'y1': 100, 'x2': 200, 'y2': 180}
+        assert car.center_coordinates == pytest.approx({'x': 150 / 640, 'y': 140 / 640})
+        assert truck.vehicle_type == 'truck'
+        assert truck.lane == 'unknown'
+        assert sum(result.lane_counts.values()) == 0
     
-    @pytest.mark.asyncio
-    async def test_determine_vehicle_lane(self, detector):
-        """Test lane determination logic"""
-        # Test center coordinates for each lane
-        north_lane = detector._determine_vehicle_lane(0.5, 0.2)  # Top center
-        assert north_lane == 'north'
+    async def test_process_detection_results_tensor_boxes(self, detector):
+        """Test ultralytics Boxes backed by torch tensors are read in bulk"""
+        pytest.importorskip("ultralytics")
+        import torch
+        from ultralytics.engine.results import Boxes
+        
+        # Rows are x1, y1, x2, y2, confidence, class
+        boxes = Boxes(
+            torch.tensor([[300., 10., 340., 250., 0.85, 2.], [5., 5., 50., 50., 0.6, 0.]]),
+            (640, 640)
+        )
         
-        south_lane = detector._determine_vehicle_lane(0.5, 0.8)  # Bottom center
-        assert south_lane == 'south'
+        vehicles, lane_indices = detector._process_detection_results(
+            [FakeResult(boxes)], (640, 640, 3)
+        )
         
-        east_lane = detector._determine_vehicle_lane(0.8, 0.5)  # Right center
-        assert east_lane == 'east'
+        assert len(vehicles) == 1
+        assert vehicles[0].vehicle_type == 'car'
+        assert vehicles[0].lane == 'north'
+        assert lane_indices.tolist() == [0]
+    
+    @pytest.mark.parametrize("center_x,center_y,expected_lane", [
+        (0.5, 0.2, 'north'),    # Top center
+        (0.5, 0.8, 'south'),    # Bottom center
+        (0.8, 0.5, 'east'),     # Right center
+        (0.2, 0.5, 'west'),     # Left center
+        (0.5, 0.5, 'unknown'),  # Intersection center
+    ])
+    async def test_determine_vehicle_lane(self, detector, center_x, center_y, expected_lane):
+        """Test lane determination logic"""
+        assert detector._determine_vehicle_lane(center_x, center_y) == expected_lane
+    
+    async def test_determine_vehicle_lanes_batched(self, detector):
+        """Test batched lane lookup against the scalar one"""
+        lanes = detector._determine_vehicle_lanes(
+            np.array([0.5, 0.5, 0.8, 0.2, 0.5]),
+            np.array([0.2, 0.8, 0.5, 0.5, 0.5])
+        )
+        assert lanes.tolist() == ['north', 'south', 'east', 'west', 'unknown']
         
-        west_lane = detector._determine_vehicle_lane(0.2, 0.5)  # Left center
-        assert west_lane == 'west'
+        # Batched lookup must agree with the scalar one across the image
+        grid_x, grid_y = np.meshgrid(np.linspace(0, 1, 41), np.linspace(0, 1, 41))
+        center_x, center_y = grid_x.ravel(), grid_y.ravel()
+        batched_lanes = detector._determine_vehicle_lanes(center_x, center_y)
         
-        # Test unknown lane (center)
-        unknown_lane = detector._determine_vehicle_lane(0.5, 0.5)
-        assert unknown_lane == 'unknown'
+        assert batched_lanes.tolist() == [
+            detector._determine_vehicle_lane(x, y) for x, y in zip(center_x, center_y)
+        ]
     
-    @pytest.mark.asyncio
     async def test_count_vehicles_by_lane(self, detector):
         """Test vehicle counting by lane"""
         # Create test detected vehicles
@@ -134,9 +183,18 @@ class TestIntelligentVehicleDetector:
         assert lane_counts['east'] == 1
         assert lane_counts['south'] == 0
         assert lane_counts['west'] == 0
+        
+        # Lane index arrays (-1 = unknown) must give the same counts
+        lane_indices = detector._lane_indices(
+            np.array([0.5, 0.8, 0.5]), np.array([0.2, 0.5, 0.5])
+        )
+        assert lane_indices.tolist() == [0, 2, -1]
+        assert detector._count_vehicles_by_lane(lane_indices) == lane_counts
     
-    async def test_save_annotated_image(self, detector, sample_image, test_output_dir):
+    async def test_save_annotated_image(self, detector, sample_image, tmp_path, monkeypatch):
         """Test annotated image saving"""
+        # Annotated output goes to ./output_images; keep it out of the shared input dir
+        monkeypatch.chdir(tmp_path)
         image = cv2.imread(sample_image)
         
         vehicles = [
@@ -156,17 +214,55 @@ class TestIntelligentVehicleDetector:
         assert output_path is not None
         assert Path(output_path).exists()
     
-    @pytest.mark.asyncio
+    async def test_encode_annotated_image(self, detector, sample_image):
+        """Test annotated image encoding to in-memory JPEG bytes"""
+        image = cv2.imread(sample_image)
+        
+        vehicles = [
+            DetectedVehicle(
+                vehicle_type='car',
+                confidence=0.8,
+                bounding_box={'x1': 100, 'y1': 100, 'x2': 200, 'y2': 180},
+                center_coordinates={'x': 0.3, 'y': 0.3},
+                lane=LaneDirection.NORTH
+            )
+        ]
+        
+        encoded_image = detector._encode_annotated_image(image, vehicles)
+        
+        assert len(encoded_image) > 0
+        decoded = cv2.imdecode(np.frombuffer(encoded_image, np.uint8), cv2.IMREAD_COLOR)
+        assert decoded is not None
+        assert decoded.shape == image.shape
+    
+    async def test_save_annotated_image_disabled(self, detector, sample_image, tmp_path, monkeypatch):
+        """Test annotated images are not written when persistence is disabled"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(settings, 'persist_annotated_images', False)
+        
+        output_path = await detector._save_annotated_image(
+            cv2.imread(sample_image), [], sample_image
+        )
+        
+        assert output_path is None
+        assert not (tmp_path / "output_images").exists()
+    
     async def test_update_performance_metrics(self, detector):
         """Test performance metrics updating"""
-        initial_count = detector.performance_metrics['total_detections']
+        initial_count = detector.performance_metrics.total_detections
+        initial_average = detector.performance_metrics.average_inference_time
         
         detector._update_performance_metrics(0.5)
         
-        assert detector.performance_metrics['total_detections'] == initial_count + 1
-        assert detector.performance_metrics['last_detection_time'] is not None
+        assert detector.performance_metrics.total_detections == initial_count + 1
+        assert detector.performance_metrics.last_detection_time is not None
+        
+        detector._update_performance_metrics(1.5)
+        
+        assert detector.get_performance_metrics()['average_inference_time'] == pytest.approx(
+            (initial_average * initial_count + 0.5 + 1.5) / (initial_count + 2)
+        )
     
-    @pytest.mark.asyncio
     async def test_get_performance_metrics(self, detector):
         """Test performance metrics retrieval"""
         metrics = detector.get_performance_metrics()
@@ -176,7 +272,6 @@ class TestIntelligentVehicleDetector:
         assert 'last_detection_time' in metrics
         assert isinstance(metrics, dict)
     
-    @pytest.mark.asyncio
     async def test_cleanup(self, detector):
         """Test detector cleanup"""
         await detector.cleanup()
@@ -184,20 +279,25 @@ class TestIntelligentVehicleDetector:
         assert detector.model is None
         assert not detector.model_initialized
     
-    @pytest.mark.asyncio
     async def test_invalid_image_path(self, detector):
         """Test handling of invalid image path"""
         with pytest.raises(ValueError, match="Could not load image"):
             await detector.analyze_intersection_image("nonexistent_image.jpg")
     
-    @pytest.mark.asyncio
     async def test_vehicle_classes_mapping(self, detector):
         """Test vehicle class mapping"""
         assert 2 in detector.VEHICLE_CLASSES  # car
         assert detector.VEHICLE_CLASSES[2] == 'car'
         assert detector.VEHICLE_CLASSES[7] == 'truck'
+        
+        # Lookup table used for batched class -> name conversion
+        assert detector._CLASS_NAME_LUT[2] == 'car'
+        assert detector._CLASS_NAME_LUT[7] == 'truck'
+        assert detector._CLASS_NAME_LUT[0] == ''
+        assert {
+            class_id: name for class_id, name in enumerate(detector._CLASS_NAME_LUT) if name
+        } == detector.VEHICLE_CLASSES
     
-    @pytest.mark.asyncio
     async def test_lane_zones_configuration(self, detector):
         """Test lane zones configuration"""
         zones = detector.LANE_ZONES
@@ -221,6 +321,11 @@ class TestIntelligentVehicleDetector:
 class TestVehicleDetectorIntegration:
     """Integration tests for vehicle detector (require model download)"""
     
+    @pytest.fixture(autouse=True)
+    def require_ultralytics(self):
+        """Skip before touching the detector when ultralytics is not installed"""
+        pytest.importorskip("ultralytics")
+    
     @pytest.mark.skip(reason="Requires YOLO model download - enable for full integration testing")
     async def test_real_model_initialization(self):
         """Test real YOLOv8 model initialization"""
@@ -17,22 +17,48 @@ import os
 # all file paths are resolved correctly, regardless of where the script is executed from.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# --- AI Model Configuration (YOLOv2 via Darkflow) ---
+# --- AI Model Configuration (Ultralytics YOLOv8) ---
 # This section defines the paths and parameters for the vehicle detection model.
-# The system uses a pre-trained YOLOv2 model, which requires a config file and weights.
+# The system uses a pre-trained YOLOv8 model. On a CUDA machine it is exported once
+# to a TensorRT engine, which is saved next to the weights file.
 
-# Path to the YOLOv2 configuration file which defines the neural network architecture.
-MODEL_CFG = os.path.join(BASE_DIR, "cfg", "yolo-voc.cfg")
+# Path to the pre-trained YOLOv8 weights file.
+# IMPORTANT: This file (~6MB) must be downloaded manually and placed in the 'bin' directory.
+MODEL_WEIGHTS = os.path.join(BASE_DIR, "bin", "yolov8n.pt")
 
-# Path to the pre-trained YOLOv2 weights file.
-# IMPORTANT: This large file (~200MB) must be downloaded manually and placed in the 'bin' directory.
-MODEL_WEIGHTS = os.path.join(BASE_DIR, "bin", "yolov2.weights")
+# Input image size (in pixels) used for inference and for building the TensorRT engine.
+IMGSZ = 640
+
+# Lightweight alternative (darknet_detector.py): the original YOLOv2 Darknet model run
+# through OpenCV's DNN module, without TensorFlow or PyTorch.
+# IMPORTANT: yolov2.weights (~200MB) must be downloaded manually into the 'bin' directory.
+DARKNET_CFG = os.path.join(BASE_DIR, "cfg", "yolo-voc.cfg")
+DARKNET_WEIGHTS = os.path.join(BASE_DIR, "bin", "yolov2.weights")
+
+# Network input size (in pixels) for the Darknet model, as set in its cfg file.
+DARKNET_INPUT_SIZE = 416
+
+# Folder of representative intersection frames (~300-500 images) used to calibrate the
+# INT8 TensorRT engine. If it is missing or empty, an FP16 engine is built instead.
+CALIBRATION_DIR = os.path.join(BASE_DIR, "calibration_images")
+
+# TensorRT INT8 calibration table. Once written, later INT8 builds reuse it and skip
+# the calibration pass.
+CALIBRATION_CACHE = os.path.join(BASE_DIR, "bin", "calibration.cache")
 
 # Confidence threshold for the object detection model.
 # Detections with a confidence score below this value will be discarded.
 # A value of 0.4 means only detections with >= 40% confidence will be considered.
 DETECTION_THRESHOLD = 0.4
 
+# IoU threshold for non-maximum suppression. Overlapping boxes above this value are
+# merged into one detection, regardless of their vehicle class.
+NMS_IOU_THRESHOLD = 0.5
+
+# Upper bound on detections kept per image. Well above the number of vehicles a single
+# intersection camera sees, but it stops a bad frame from flooding the postprocess.
+MAX_DETECTIONS = 100
+
 # --- Simulation Configuration ---
 # This section controls the behavior and appearance of the Pygame simulation.
 
@@ -11,7 +11,7 @@ from nms cimport NMS
 @cython.cdivision(True)
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
-def yolo_box_constructor(meta,np.ndarray[float] net_out, float threshold):
+cdef tuple _yolo_decode(meta,np.ndarray[float] net_out, float threshold):
 
     cdef:
         float sqrt
@@ -48,4 +48,29 @@ def yolo_box_constructor(meta,np.ndarray[float] net_out, float threshold):
                     final_probs[grid, b, class_loop] = probs[grid, class_loop]
     
     
-    return NMS(np.ascontiguousarray(final_probs).reshape(SS*B, C) , np.ascontiguousarray(coords).reshape(SS*B, 4))
+    return np.ascontiguousarray(final_probs).reshape(SS*B, C), np.ascontiguousarray(coords).reshape(SS*B, 4)
+
+
+def yolo_box_constructor(meta,np.ndarray[float] net_out, float threshold):
+    final_probs, coords = _yolo_decode(meta, net_out, threshold)
+    return NMS(final_probs, coords)
+
+
+def yolo_box_array(meta,np.ndarray[float] net_out, float threshold):
+    """
+    Decoded candidate boxes as one structured array with float32 fields
+    x, y, w, h and probs (one column per class), so callers can slice whole
+    columns at once. Unlike yolo_box_constructor no NMS is applied here:
+    every box with a class probability above threshold is returned, and the
+    caller runs its own suppression (see yolo.predict.process_boxes).
+    """
+    final_probs, coords = _yolo_decode(meta, net_out, threshold)
+    kept = np.flatnonzero(final_probs.max(axis=1) > 0)
+    boxes = np.empty(len(kept), dtype=[
+        ('x', 'f4'), ('y', 'f4'), ('w', 'f4'), ('h', 'f4'),
+        ('probs', 'f4', (meta['classes'],))
+    ])
+    xywh = coords[kept]
+    boxes['x'], boxes['y'], boxes['w'], boxes['h'] = xywh[:, 0], xywh[:, 1], xywh[:, 2], xywh[:, 3]
+    boxes['probs'] = final_probs[kept]
+    return boxes
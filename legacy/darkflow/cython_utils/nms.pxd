@@ -7,5 +7,6 @@ from utils.box import BoundBox
 
 
 cdef NMS(float[:, ::1] , float[:, ::1] )
+cdef list NMS_indices(float[:, ::1] , float[:, ::1] )
 
 
@@ -60,8 +60,10 @@ cdef float box_iou_c(float ax, float ay, float aw, float ah, float bx, float by,
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.cdivision(True)
-cdef NMS(float[:, ::1] final_probs , float[:, ::1] final_bbox):
-    cdef list boxes = list()
+cdef list NMS_indices(float[:, ::1] final_probs , float[:, ::1] final_bbox):
+    """per-class suppression; zeroes suppressed probs in place and returns the
+    kept box indices in visiting order"""
+    cdef list kept = list()
     cdef set indices = set()
     cdef:
         np.intp_t pred_length,class_length,class_loop,index,index2
@@ -82,15 +84,28 @@ cdef NMS(float[:, ::1] final_probs , float[:, ::1] final_bbox):
                     final_probs[index2,class_loop]=0
             
             if index not in indices:
-                bb=BoundBox(class_length)
-                bb.x = final_bbox[index, 0]
-                bb.y = final_bbox[index, 1]
-                bb.w = final_bbox[index, 2]
-                bb.h = final_bbox[index, 3]
-                bb.c = final_bbox[index, 4]
-                bb.probs = np.asarray(final_probs[index,:])
-                boxes.append(bb)
+                kept.append(index)
                 indices.add(index)
+    return kept
+
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.cdivision(True)
+cdef NMS(float[:, ::1] final_probs , float[:, ::1] final_bbox):
+    cdef list boxes = list()
+    cdef:
+        np.intp_t class_length,index
+
+    class_length = final_probs.shape[1]
+    for index in NMS_indices(final_probs, final_bbox):
+        bb=BoundBox(class_length)
+        bb.x = final_bbox[index, 0]
+        bb.y = final_bbox[index, 1]
+        bb.w = final_bbox[index, 2]
+        bb.h = final_bbox[index, 3]
+        bb.c = final_bbox[index, 4]
+        bb.probs = np.asarray(final_probs[index,:])
+        boxes.append(bb)
     return boxes
 
 # cdef NMS(float[:, ::1] final_probs , float[:, ::1] final_bbox):
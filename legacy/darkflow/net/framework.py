@@ -30,6 +30,8 @@ class YOLO(framework):
     resize_input = yolo.predict.resize_input
     findboxes = yolo.predict.findboxes
     process_box = yolo.predict.process_box
+    process_boxes = yolo.predict.process_boxes
+    findbox_array = yolo.predict.findbox_array
 
 class YOLOv2(framework):
     constructor = yolo.constructor
@@ -127,7 +127,7 @@ def camera(self):
             net_out = self.sess.run(self.out, feed_dict)
             for img, single_out in zip(buffer_inp, net_out):
                 postprocessed = self.framework.postprocess(
-                    single_out, img, False)
+                    single_out, img, False, inplace=True)
                 if SaveVideo:
                     videoWriter.write(postprocessed)
                 if file == 0: #camera window
@@ -2,6 +2,8 @@ from . import train
 from . import predict
 from . import data
 from . import misc
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import numpy as np
 
 
@@ -29,8 +31,17 @@ def constructor(self, meta, FLAGS):
 	for x in range(len(meta['labels'])): 
 		colors += [_to_color(x, base)]
 	meta['colors'] = colors
+	self._colors = [tuple(c) for c in colors] # per-class draw colors, indexed by class
 	self.fetch = list()
 	self.meta, self.FLAGS = meta, FLAGS
+	self._outfolder = None # set by postprocess on the first saved image
+	self._io_pool = ThreadPoolExecutor(max_workers=2) # writes annotated images
+
+	# input size is fixed once the cfg is parsed; resize_input keeps its
+	# scratch buffer per thread since preprocess runs from a thread pool
+	self._inp_h, self._inp_w, _ = meta['inp_size']
+	self._resize_bufs = threading.local()
+	self._threshold = FLAGS.threshold # read by findboxes/postprocess per frame
 
 	# over-ride the threshold in meta if FLAGS has it.
 	if FLAGS.threshold > 0.0:
@@ -0,0 +1,87 @@
+"""
+Compiled kernels for YOLO post-processing.
+
+`filter_and_clamp` is the numeric core of `process_boxes`: it thresholds every
+candidate box on its best class probability and converts the survivors to
+clamped pixel corners. With numba installed it is a single JIT-compiled loop,
+cached to disk (`cache=True`) and warmed up at import so neither a fresh process
+nor the first frame pays for compilation. Without numba the same contract is
+served by a NumPy implementation.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # numba is optional; decorated helpers simply run as plain Python
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+
+if HAVE_NUMBA:
+    @njit(cache=True)
+    def filter_and_clamp(xs, ys, ws, hs, probs, thresh, h, w):
+        """
+        Returns the (left, right, top, bot) int32 corners, best class index and
+        best class probability of every box whose best probability > thresh.
+        """
+        n, classes = probs.shape
+        corners = np.empty((n, 4), dtype=np.int32)
+        max_indx = np.empty(n, dtype=np.intp)
+        max_prob = np.empty(n, dtype=probs.dtype)
+        k = 0
+        for i in range(n):
+            # Best class, first one wins on ties like np.argmax
+            best = 0
+            best_prob = probs[i, 0]
+            for j in range(1, classes):
+                if probs[i, j] > best_prob:
+                    best = j
+                    best_prob = probs[i, j]
+            if best_prob <= thresh:
+                continue
+
+            # Relative (0-1) to absolute pixel coordinates, truncated like int()
+            corners[k, 0] = max(int((xs[i] - ws[i] / 2.) * w), 0)
+            corners[k, 1] = min(int((xs[i] + ws[i] / 2.) * w), w - 1)
+            corners[k, 2] = max(int((ys[i] - hs[i] / 2.) * h), 0)
+            corners[k, 3] = min(int((ys[i] + hs[i] / 2.) * h), h - 1)
+            max_indx[k] = best
+            max_prob[k] = best_prob
+            k += 1
+        return corners[:k], max_indx[:k], max_prob[:k]
+
+    # Compile (or load from the on-disk cache) at import, using the types
+    # process_boxes passes: float64 coordinates and the float32 probs field
+    # of the structured box array
+    # (a strided 'A'-layout view, hence at least two rows and classes)
+    _coords = np.zeros(2)
+    _boxes = np.zeros(2, dtype=[('x', 'f4'), ('y', 'f4'), ('w', 'f4'), ('h', 'f4'), ('probs', 'f4', (2,))])
+    filter_and_clamp(_coords, _coords, _coords, _coords, _boxes['probs'], 0.5, 1, 1)
+    del _coords, _boxes
+else:
+    def filter_and_clamp(xs, ys, ws, hs, probs, thresh, h, w):
+        """
+        Returns the (left, right, top, bot) int32 corners, best class index and
+        best class probability of every box whose best probability > thresh.
+        """
+        # Cheap max first, so argmax only runs on the boxes that survive
+        max_prob = probs.max(axis=1)
+        keep = max_prob > thresh
+        max_indx, max_prob = probs[keep].argmax(axis=1), max_prob[keep]
+        x, y, bw, bh = xs[keep], ys[keep], ws[keep], hs[keep]
+
+        # Relative (0-1) to absolute pixel coordinates, truncated like int(),
+        # then clamped to the image boundaries
+        corners = np.stack([
+            (x - bw / 2.) * w, (x + bw / 2.) * w,
+            (y - bh / 2.) * h, (y + bh / 2.) * h
+        ], axis=1).astype(np.int32)
+        np.maximum(corners[:, 0::2], 0, out=corners[:, 0::2])
+        np.minimum(corners[:, 1], w - 1, out=corners[:, 1])
+        np.minimum(corners[:, 3], h - 1, out=corners[:, 3])
+        return corners, max_indx, max_prob
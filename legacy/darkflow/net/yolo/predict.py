@@ -10,8 +10,10 @@ boxes, class labels, and confidence scores for each detected object.
 
 Key Functions:
 - `findboxes`: Decodes the raw network output tensor into a list of potential bounding boxes.
+- `findbox_array`: Same decoding, returned as one structured NumPy array for `process_boxes`.
 - `process_box`: Applies a confidence threshold, scales the box coordinates to the original
   image size, and performs Non-Max Suppression (NMS) to filter out duplicate detections.
+- `process_boxes`: Vectorized `process_box` over every candidate box at once.
 - `postprocess`: The main function that orchestrates the entire post-processing pipeline,
   draws the final bounding boxes on the image, and saves the result.
 =========================================================================================
@@ -23,27 +25,82 @@ import numpy as np
 import cv2
 import os
 import json
-from ...cython_utils.cy_yolo_findboxes import yolo_box_constructor
+from ...cython_utils.cy_yolo_findboxes import yolo_box_constructor, yolo_box_array
 
-def _fix(obj, dims, scale, offs):
-    """Helper function to adjust bounding box coordinates during data augmentation."""
-    for i in range(1, 5):
-        dim = dims[(i + 1) % 2]
-        off = offs[(i + 1) % 2]
-        obj[i] = int(obj[i] * scale - off)
-        obj[i] = max(min(obj[i], dim), 0)
+try:
+    import orjson
+except ImportError:
+    orjson = None # optional; falls back to the stdlib json module
+from ._post_kernel import njit, filter_and_clamp
+
+# IoU above which the weaker of two same-class boxes is dropped (matches cython_utils.nms)
+NMS_IOU_THRESHOLD = 0.4
+
+@njit(cache=True)
+def _fix(coords, dims, scale, offs):
+    """
+    Helper function to adjust bounding box coordinates during data augmentation.
+    `coords` is an int64 array (xmin, ymin, xmax, ymax) updated in place.
+    """
+    for i in range(4):
+        dim = dims[i % 2]
+        off = offs[i % 2]
+        coords[i] = max(min(int(coords[i] * scale - off), dim), 0)
+
+# Compile once at import so the first training batch doesn't pay for it
+_fix(np.zeros(4, dtype=np.int64), np.ones(2, dtype=np.int64), 1.0, np.zeros(2, dtype=np.int64))
+
+def write_image(img_name, imgcv):
+    """
+    Encodes an image in memory and writes it atomically: the bytes go to a
+    temporary file that is renamed over `img_name`, so readers never see a
+    half-written image. Runs on the framework's I/O thread pool, whose futures
+    nobody waits on, so failures are reported here and never raised.
+    """
+    tmp_name = img_name + '.tmp'
+    try:
+        ok, buf = cv2.imencode(os.path.splitext(img_name)[1] or '.jpg', imgcv)
+        if not ok:
+            print('Failed to encode {}'.format(img_name))
+            return False
+        with open(tmp_name, 'wb') as f:
+            f.write(buf.tobytes())
+        os.replace(tmp_name, img_name)
+        return True
+    except Exception as e:
+        print('Failed to write {}: {}'.format(img_name, e))
+        # Don't leave a partial temporary file next to the outputs
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        return False
+
+def write_json(text_file, results):
+    """
+    Writes per-image detection results as JSON, with orjson when it is available
+    (serializes straight to bytes, several times faster than stdlib json).
+    """
+    if orjson is not None:
+        with open(text_file, 'wb') as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    else:
+        with open(text_file, 'w') as f:
+            json.dump(results, f, indent=4)
 
 def resize_input(self, im):
     """
     Resizes the input image to the dimensions required by the YOLO model's config.
     Also normalizes pixel values to the range [0, 1] and reorders color channels
     from BGR (OpenCV's default) to RGB.
+    The resize and channel swap reuse a per-thread uint8 scratch buffer (images
+    are preprocessed from a thread pool) and the scaling writes float32 directly,
+    so the only allocation per image is the returned array.
     """
-    h, w, c = self.meta['inp_size']
-    imsz = cv2.resize(im, (w, h))
-    imsz = imsz / 255.
-    imsz = imsz[:,:,::-1] # BGR -> RGB
-    return imsz
+    imsz = getattr(self._resize_bufs, 'buf', None)
+    if imsz is None:
+        imsz = self._resize_bufs.buf = np.empty((self._inp_h, self._inp_w, 3), dtype=np.uint8)
+    imsz = cv2.resize(im, (self._inp_w, self._inp_h), dst=imsz)
+    cv2.cvtColor(imsz, cv2.COLOR_BGR2RGB, dst=imsz)
+    return np.multiply(imsz, np.float32(1. / 255.), dtype=np.float32)
 
 def process_box(self, b, h, w, threshold):
     """
@@ -72,18 +129,55 @@ def process_box(self, b, h, w, threshold):
         return (left, right, top, bot, label, max_indx, max_prob)
     return None
 
+def process_boxes(self, boxes, h, w, threshold):
+    """
+    Vectorized counterpart of `process_box`: thresholds and scales all candidate
+    boxes in one compiled pass (see `_post_kernel.filter_and_clamp`) instead of
+    one Python call per box. Overlapping boxes of the same class are then
+    suppressed with OpenCV's NMS, which is the only NMS pass on this path.
+    `boxes` is the structured array of pre-NMS candidates from `findbox_array`.
+    Returns the pixel corners (left, right, top, bot) as an int array of shape
+    [K, 4], plus the class index and confidence of each of the K kept boxes.
+    """
+    if len(boxes) == 0:
+        return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.intp), np.empty(0)
+
+    # Coordinates are widened to float64 so pixel truncation matches process_box
+    xs, ys, ws, hs = (boxes[field].astype(np.float64) for field in ('x', 'y', 'w', 'h'))
+
+    corners, max_indx, max_prob = filter_and_clamp(xs, ys, ws, hs, boxes['probs'], threshold, h, w)
+    if len(corners) == 0:
+        return corners, max_indx, max_prob
+
+    # Per-class NMS in one call: shifting each class onto its own stretch of the
+    # x axis keeps boxes of different classes from suppressing each other
+    shift = max_indx * (max(h, w) + 1)
+    boxes_xywh = np.stack([
+        corners[:, 0] + shift, corners[:, 2],
+        corners[:, 1] - corners[:, 0], corners[:, 3] - corners[:, 2]
+    ], axis=1)
+    idxs = cv2.dnn.NMSBoxes(boxes_xywh.tolist(), max_prob.tolist(), threshold, NMS_IOU_THRESHOLD)
+    idxs = np.sort(np.asarray(idxs, dtype=np.intp).reshape(-1))
+
+    return corners[idxs], max_indx[idxs], max_prob[idxs]
+
 def findboxes(self, net_out):
     """
     This is the crucial step of interpreting the network's raw output tensor.
     It calls a Cython-optimized function to efficiently decode the grid-based
     predictions of YOLO into a list of bounding box objects.
     """
-    meta = self.meta
-    threshold = self.FLAGS.threshold
-
     # yolo_box_constructor is a C-compiled function for speed
-    boxes = yolo_box_constructor(meta, net_out, threshold)
-    return boxes
+    return yolo_box_constructor(self.meta, net_out, self._threshold)
+
+def findbox_array(self, net_out):
+    """
+    Same decoding as `findboxes`, but the Cython constructor returns the
+    candidate boxes before NMS as one structured array (float32 fields x, y,
+    w, h and per-class probs) so `process_boxes` can work on whole columns
+    without a BoundBox per box, and suppress overlaps in a single NMS pass.
+    """
+    return yolo_box_array(self.meta, net_out, self._threshold)
 
 def preprocess(self, im, allobj=None):
     """
@@ -99,8 +193,12 @@ def preprocess(self, im, allobj=None):
         im, dims, trans_param = result
         scale, offs, flip = trans_param
         # Adjust ground-truth bounding boxes to match the augmented image
+        dims_wh = np.asarray(dims[:2], dtype=np.int64)
+        offs = np.asarray(offs, dtype=np.int64)
         for obj in allobj:
-            _fix(obj, dims, scale, offs)
+            coords = np.asarray(obj[1:5], dtype=np.int64)
+            _fix(coords, dims_wh, float(scale), offs)
+            obj[1:5] = coords.tolist()
             if flip:
                 obj_1_ = obj[1]
                 obj[1] = dims[0] - obj[3]
@@ -110,62 +208,70 @@ def preprocess(self, im, allobj=None):
     im = self.resize_input(im)
     return im
 
-def postprocess(self, net_out, im, save=True):
+def postprocess(self, net_out, im, save=True, inplace=False):
     """
     The final step: takes the network output, finds boxes, draws them on the
     original image, and saves the result.
+    With `inplace=True` an ndarray `im` is drawn on directly instead of copied,
+    for callers such as video loops that discard the frame afterwards.
     """
     meta = self.meta
-    threshold = self.FLAGS.threshold
+    threshold = self._threshold
 
     # Find all potential bounding boxes from the raw network output
-    boxes = self.findboxes(net_out)
+    boxes = self.findbox_array(net_out)
 
     if not isinstance(im, np.ndarray):
         imgcv = cv2.imread(im)
+    elif inplace:
+        imgcv = im
     else:
         imgcv = im.copy() # Work on a copy to avoid modifying the original array
 
     h, w, _ = imgcv.shape
-    resultsForJSON = []
-
-    # Process each found box
-    for b in boxes:
-        boxResults = self.process_box(b, h, w, threshold)
-        if boxResults is None:
-            continue # Skip if confidence was too low
-
-        left, right, top, bot, mess, max_indx, confidence = boxResults
-        thick = int((h + w) / 400) # Dynamic thickness for the bounding box
-
-        # If JSON output is enabled, store results instead of drawing
-        if self.FLAGS.json:
-            resultsForJSON.append({
-                "label": mess,
-                "confidence": float(f'{confidence:.2f}'),
+    thick = int((h + w) / 400) # Dynamic thickness for the bounding box
+
+    # Threshold and scale all boxes at once; only drawing stays per box
+    corners, class_indx, confidences = self.process_boxes(boxes, h, w, threshold)
+    labels = meta['labels']
+
+    # If JSON output is enabled, collect all results in one pass instead of drawing
+    if self.FLAGS.json:
+        resultsForJSON = [
+            {
+                "label": labels[max_indx],
+                "confidence": confidence,
                 "topleft": {"x": left, "y": top},
                 "bottomright": {"x": right, "y": bot}
-            })
-            continue
-
+            }
+            for (left, right, top, bot), max_indx, confidence
+            # Rounded in float64: float32 values would print as e.g. 0.8500000238418579
+            in zip(corners.tolist(), class_indx.tolist(), confidences.astype(np.float64).round(2).tolist())
+        ]
+    else:
         # Draw the rectangle and the label on the image
-        cv2.rectangle(imgcv, (left, top), (right, bot), meta['colors'][max_indx], thick)
-        cv2.putText(imgcv, mess, (left, top - 12), cv2.FONT_HERSHEY_SIMPLEX, 1e-3 * h, meta['colors'][max_indx], thick // 2)
+        colors = self._colors
+        font_scale, text_thick = 1e-3 * h, thick // 2 # fixed for the whole frame
+        for (left, right, top, bot), max_indx in zip(corners.tolist(), class_indx.tolist()):
+            color = colors[max_indx]
+            cv2.rectangle(imgcv, (left, top), (right, bot), color, thick)
+            cv2.putText(imgcv, labels[max_indx], (left, top - 12), cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, text_thick)
 
     # Save the output if not disabled
     if not save:
         return imgcv
 
-    # Handle file saving
-    outfolder = os.path.join(self.FLAGS.imgdir, 'out')
-    os.makedirs(outfolder, exist_ok=True) # Ensure the output directory exists
-    img_name = os.path.join(outfolder, os.path.basename(im))
+    # Handle file saving; the output folder is resolved and created once,
+    # on the first saved image, instead of once per frame
+    if self._outfolder is None:
+        self._outfolder = os.path.join(self.FLAGS.imgdir, 'out')
+        os.makedirs(self._outfolder, exist_ok=True)
+    img_name = os.path.join(self._outfolder, os.path.basename(im))
 
     if self.FLAGS.json:
         # Save results as a JSON file
         textFile = os.path.splitext(img_name)[0] + ".json"
-        with open(textFile, 'w') as f:
-            json.dump(resultsForJSON, f, indent=4)
+        write_json(textFile, resultsForJSON)
     else:
-        # Save the image with drawn boxes
-        cv2.imwrite(img_name, imgcv)
+        # Save the image with drawn boxes off the detection thread
+        self._io_pool.submit(write_image, img_name, imgcv)
@@ -2,11 +2,11 @@ import numpy as np
 import math
 import cv2
 import os
-import json
 #from scipy.special import expit
 #from utils.box import BoundBox, box_iou, prob_compare
 #from utils.box import prob_compare2, box_intersection
 from ...utils.box import BoundBox
+from ..yolo.predict import write_image, write_json
 from ...cython_utils.cy_yolo2_findboxes import box_constructor
 
 def expit(x):
@@ -24,21 +24,27 @@ def findboxes(self, net_out):
 	boxes=box_constructor(meta,net_out)
 	return boxes
 
-def postprocess(self, net_out, im, save = True):
+def postprocess(self, net_out, im, save = True, inplace = False):
 	"""
 	Takes net output, draw net_out, save to disk
+	With inplace=True an ndarray im is drawn on directly instead of copied
+	(before inplace was added, yolov2 always drew on im directly; callers
+	relying on that must now pass inplace=True)
 	"""
 	boxes = self.findboxes(net_out)
 
 	# meta
 	meta = self.meta
 	threshold = meta['thresh']
-	colors = meta['colors']
+	colors = self._colors
 	labels = meta['labels']
 	if type(im) is not np.ndarray:
 		imgcv = cv2.imread(im)
-	else: imgcv = im
+	elif inplace: imgcv = im
+	else: imgcv = im.copy()
 	h, w, _ = imgcv.shape
+	thick = int((h + w) // 300)
+	font_scale, text_thick = 1e-3 * h, thick // 3 # fixed for the whole frame
 	
 	resultsForJSON = []
 	for b in boxes:
@@ -46,7 +52,6 @@ def postprocess(self, net_out, im, save = True):
 		if boxResults is None:
 			continue
 		left, right, top, bot, mess, max_indx, confidence = boxResults
-		thick = int((h + w) // 300)
 		if self.FLAGS.json:
 			resultsForJSON.append({"label": mess, "confidence": float('%.2f' % confidence), "topleft": {"x": left, "y": top}, "bottomright": {"x": right, "y": bot}})
 			continue
@@ -55,17 +60,17 @@ def postprocess(self, net_out, im, save = True):
 			(left, top), (right, bot),
 			colors[max_indx], thick)
 		cv2.putText(imgcv, mess, (left, top - 12),
-			0, 1e-3 * h, colors[max_indx],thick//3)
+			0, font_scale, colors[max_indx], text_thick)
 
 	if not save: return imgcv
 
-	outfolder = os.path.join(self.FLAGS.imgdir, 'out')
-	img_name = os.path.join(outfolder, os.path.basename(im))
+	if self._outfolder is None:
+		self._outfolder = os.path.join(self.FLAGS.imgdir, 'out')
+		os.makedirs(self._outfolder, exist_ok=True)
+	img_name = os.path.join(self._outfolder, os.path.basename(im))
 	if self.FLAGS.json:
-		textJSON = json.dumps(resultsForJSON)
 		textFile = os.path.splitext(img_name)[0] + ".json"
-		with open(textFile, 'w') as f:
-			f.write(textJSON)
+		write_json(textFile, resultsForJSON)
 		return
 
-	cv2.imwrite(img_name, imgcv)
+	self._io_pool.submit(write_image, img_name, imgcv)
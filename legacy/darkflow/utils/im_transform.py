@@ -7,13 +7,15 @@ def imcv2_recolor(im, a = .1):
 	t += [np.random.uniform()]
 	t = np.array(t) * 2. - 1.
 
-	# random amplify each channel
-	im = im * (1 + t * a)
+	# random amplify each channel, normalized by the max value in the same
+	# pass; all intermediates stay float32 instead of full-size float64 copies
 	mx = 255. * (1 + a)
+	im = np.multiply(im, ((1 + t * a) / mx).astype(np.float32), dtype=np.float32)
 	up = np.random.uniform() * 2 - 1
 # 	im = np.power(im/mx, 1. + up * .5)
-	im = cv2.pow(im/mx, 1. + up * .5)
-	return np.array(im * 255., np.uint8)
+	cv2.pow(im, 1. + up * .5, dst=im)
+	np.multiply(im, np.float32(255.), out=im)
+	return im.astype(np.uint8)
 
 def imcv2_affine_trans(im):
 	# Scale and translate
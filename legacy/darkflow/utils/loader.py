@@ -122,6 +122,9 @@ class weights_walker(object):
             # self.offset = 16+44948600-44138056
             
             self.offset=16
+            # map the whole file once; walk() hands out lazily paged slices
+            self.float32s = np.memmap(path, mode = 'r',
+                dtype = np.float32, shape = (self.size // 4,))
             
     def walk(self, size):
         if self.eof: return None
@@ -129,11 +132,8 @@ class weights_walker(object):
         assert end_point <= self.size, \
         'Over-read {}'.format(self.path)
 
-        float32_1D_array = np.memmap(
-            self.path, shape = (), mode = 'r', 
-            offset = self.offset,
-            dtype='({})float32,'.format(size)
-        )
+        start = self.offset // 4
+        float32_1D_array = self.float32s[start : start + size]
 
         self.offset = end_point
         if end_point == self.size: 
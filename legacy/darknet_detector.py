@@ -0,0 +1,130 @@
+"""
+=========================================================================================
+Darknet Vehicle Detector Module (OpenCV DNN)
+=========================================================================================
+Purpose:
+This module contains DarknetVehicleDetector, a lightweight alternative to the
+Ultralytics-based VehicleDetector. It runs the original YOLOv2 Darknet model
+(cfg/yolo-voc.cfg + bin/yolov2.weights) through OpenCV's DNN module, so it needs
+neither TensorFlow nor PyTorch. With a CUDA-enabled OpenCV build it runs on the GPU
+in FP16; otherwise it uses OpenCV's optimized CPU backend.
+
+It exposes the same detect_vehicles / detect_vehicles_frame methods and returns the
+same lane counts as VehicleDetector.
+=========================================================================================
+"""
+
+import json
+import os
+import cv2
+import numpy as np
+import config  # Imports settings from the central configuration file
+
+# Lane for each image quadrant, indexed by quadrant id: bit 0 is set for the right half
+# of the image and bit 1 for the bottom half (same layout as in vehicle_detector).
+LANE_BY_QUADRANT = ('up', 'right', 'left', 'down')
+
+# Pascal VOC class ids of the vehicle types we are interested in: bicycle (1), bus (5),
+# car (6) and motorbike (13). The VOC model has no truck class.
+VEHICLE_CLASS_IDS = (1, 5, 6, 13)
+
+
+class DarknetVehicleDetector:
+    """
+    Detects vehicles with the YOLOv2 Darknet model via OpenCV DNN and categorizes them
+    into the four directional lanes of a standard four-way intersection.
+    """
+
+    def __init__(self):
+        """
+        Initializes the detector by loading the Darknet model.
+        This is an expensive operation and should only be done once per session.
+        """
+        print("Loading Darknet vehicle detection model into memory...")
+        self.net = cv2.dnn.readNetFromDarknet(config.DARKNET_CFG, config.DARKNET_WEIGHTS)
+        if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+            # OpenCV's CUDA backend, using FP16 (Tensor Core) kernels where available.
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA_FP16)
+        self.output_names = self.net.getUnconnectedOutLayersNames()
+        print("Model loaded successfully.")
+
+        self.vehicle_class_ids = np.array(VEHICLE_CLASS_IDS)
+
+    def detect_vehicles(self, image_path):
+        """
+        Detects and counts vehicles in the specified image, assigning each vehicle to a lane.
+
+        Args:
+            image_path (str): The full path to the image file to be processed.
+
+        Returns:
+            dict: A dictionary containing the vehicle count for each of the four lanes
+                  ('right', 'left', 'up', 'down'). Returns zero counts if the image
+                  cannot be read; model errors propagate to the caller.
+        """
+        image = cv2.imread(image_path)
+        if image is None:
+            print(f"[ERROR] Image not found or could not be read at path: {image_path}")
+            return {'right': 0, 'left': 0, 'up': 0, 'down': 0}
+        return self.detect_vehicles_frame(image)
+
+    def detect_vehicles_frame(self, frame):
+        """
+        Detects and counts vehicles in a BGR frame that is already in memory.
+
+        Args:
+            frame (np.ndarray): A BGR uint8 image.
+
+        Returns:
+            dict: A dictionary containing the vehicle count for each of the four lanes.
+        """
+        size = config.DARKNET_INPUT_SIZE
+        blob = cv2.dnn.blobFromImage(frame, 1 / 255.0, (size, size), swapRB=True, crop=False)
+        self.net.setInput(blob)
+        # Each row is (center_x, center_y, width, height, objectness, class scores...),
+        # with coordinates relative to the image size.
+        detections = np.concatenate(self.net.forward(self.output_names))
+
+        # Best class and its score for every candidate box, then keep confident vehicles.
+        scores = detections[:, 5:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = (confidences > config.DETECTION_THRESHOLD) & np.isin(class_ids, self.vehicle_class_ids)
+        boxes, confidences = detections[keep, :4], confidences[keep]
+
+        # Class-agnostic NMS, so one vehicle detected as two classes is counted once.
+        corner_boxes = np.column_stack([boxes[:, :2] - boxes[:, 2:] / 2, boxes[:, 2:]])
+        kept = cv2.dnn.NMSBoxes(
+            corner_boxes.tolist(), confidences.tolist(),
+            config.DETECTION_THRESHOLD, config.NMS_IOU_THRESHOLD
+        )
+        centers = boxes[np.asarray(kept, dtype=np.intp).reshape(-1), :2]
+
+        # Centers are relative, so the image center is at 0.5 on both axes.
+        quadrant = (centers[:, 0] >= 0.5).astype(np.intp) + 2 * (centers[:, 1] >= 0.5)
+        counts = np.bincount(quadrant, minlength=4)
+        return dict(zip(LANE_BY_QUADRANT, counts.tolist()))
+
+
+# This block allows the script to be run directly for testing purposes.
+if __name__ == '__main__':
+    """
+    Example of how to use the DarknetVehicleDetector class independently.
+    To run: python darknet_detector.py path/to/your/image.jpg
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Detect vehicles in an image with the YOLOv2 Darknet model.")
+    parser.add_argument("image_path", type=str, help="Path to the input image file.")
+    args = parser.parse_args()
+
+    if not os.path.exists(config.DARKNET_WEIGHTS) or not os.path.exists(args.image_path):
+        print("[FATAL ERROR] Ensure yolov2.weights is in the /bin folder and the image path is correct.")
+    else:
+        detector = DarknetVehicleDetector()
+        counts = detector.detect_vehicles(args.image_path)
+
+        print("\n--- Standalone Detection Results ---")
+        print(json.dumps(counts, indent=4))
+        print("------------------------------------")
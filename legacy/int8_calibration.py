@@ -0,0 +1,135 @@
+"""
+=========================================================================================
+INT8 TensorRT Engine Builder
+=========================================================================================
+Purpose:
+This module builds an INT8 TensorRT engine for the vehicle detection model. INT8
+roughly doubles throughput over FP16 and halves the engine size, but TensorRT needs
+to see representative input to pick the quantization ranges for each layer. The
+EntropyCalibrator class feeds it frames captured at the intersection, and the
+resulting calibration table is cached so later builds skip calibration entirely.
+
+The engine is written in the same format as Ultralytics' own TensorRT export (a
+metadata header followed by the serialized engine), so it loads with YOLO(path).
+Always check the INT8 engine's mAP against the FP16 one on a held-out set, e.g. with
+YOLO(engine_path).val(data=...), before deploying it; the drop should stay under 1%.
+=========================================================================================
+"""
+
+import glob
+import json
+import os
+
+import cv2
+import numpy as np
+import onnx
+import tensorrt as trt
+import torch
+from ultralytics import YOLO
+from ultralytics.data.augment import LetterBox
+
+# Image types picked up from the calibration folder.
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+# Upper bound on calibration frames. A few hundred frames are enough for stable ranges;
+# more only makes the one-time build slower.
+MAX_CALIBRATION_IMAGES = 500
+
+
+class EntropyCalibrator(trt.IInt8EntropyCalibrator2):
+    """
+    Feeds calibration frames to TensorRT one at a time, preprocessed exactly like the
+    frames seen at inference (letterboxed, RGB, CHW, scaled to 0-1).
+    """
+
+    def __init__(self, image_dir, imgsz, cache_path):
+        """
+        Args:
+            image_dir (str): Folder of representative intersection images.
+            imgsz (int): Model input size, matching the ONNX export.
+            cache_path (str): Where the calibration table is read from and written to.
+        """
+        trt.IInt8EntropyCalibrator2.__init__(self)
+        self.cache_path = cache_path
+        self.image_paths = sorted(
+            path for pattern in IMAGE_EXTENSIONS for path in glob.glob(os.path.join(image_dir, pattern))
+        )[:MAX_CALIBRATION_IMAGES]
+        self.letterbox = LetterBox((imgsz, imgsz), auto=False)
+        self.index = 0
+
+        # One device buffer, reused for every calibration frame.
+        self.device_input = torch.empty((1, 3, imgsz, imgsz), dtype=torch.float32, device='cuda')
+
+    def get_batch_size(self):
+        return 1
+
+    def get_batch(self, names):
+        """Uploads the next calibration frame and returns its device pointer, or None when done."""
+        if self.index >= len(self.image_paths):
+            return None
+        image = cv2.imread(self.image_paths[self.index])
+        self.index += 1
+        if image is None:
+            # Skip unreadable files instead of aborting a long calibration run.
+            return self.get_batch(names)
+
+        image = self.letterbox(image=image)
+        image = np.ascontiguousarray(image[..., ::-1].transpose(2, 0, 1), dtype=np.float32) / 255.0
+        self.device_input.copy_(torch.from_numpy(image).unsqueeze(0))
+        return [int(self.device_input.data_ptr())]
+
+    def read_calibration_cache(self):
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, 'rb') as f:
+                return f.read()
+        return None
+
+    def write_calibration_cache(self, cache):
+        with open(self.cache_path, 'wb') as f:
+            f.write(cache)
+
+
+def build_int8_engine(weights_path, engine_path, image_dir, imgsz, cache_path, workspace=4):
+    """
+    Exports the model to ONNX and builds an INT8 TensorRT engine from it.
+
+    Args:
+        weights_path (str): Path to the Ultralytics .pt weights.
+        engine_path (str): Where to write the engine.
+        image_dir (str): Folder of calibration images (unused when cache_path exists).
+        imgsz (int): Model input size.
+        cache_path (str): Calibration table to reuse or create.
+        workspace (int): Builder workspace limit in GiB.
+
+    Returns:
+        str: The path of the written engine.
+    """
+    onnx_path = YOLO(weights_path).export(format='onnx', imgsz=imgsz, simplify=True)
+    # Ultralytics stores stride, names, imgsz, etc. in the ONNX metadata; the engine
+    # header needs the same fields so YOLO(engine_path) can load it.
+    metadata = {prop.key: prop.value for prop in onnx.load(onnx_path).metadata_props}
+
+    logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(logger)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, logger)
+    if not parser.parse_from_file(onnx_path):
+        raise RuntimeError(f"Failed to parse ONNX file: {onnx_path}")
+
+    config = builder.create_builder_config()
+    config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, workspace << 30)
+    config.set_flag(trt.BuilderFlag.INT8)
+    # Layers without an INT8 implementation fall back to FP16 instead of FP32.
+    config.set_flag(trt.BuilderFlag.FP16)
+    config.int8_calibrator = EntropyCalibrator(image_dir, imgsz, cache_path)
+
+    serialized_engine = builder.build_serialized_network(network, config)
+    if serialized_engine is None:
+        raise RuntimeError("TensorRT failed to build the INT8 engine.")
+
+    meta = json.dumps(metadata).encode()
+    with open(engine_path, 'wb') as f:
+        f.write(len(meta).to_bytes(4, byteorder='little', signed=True))
+        f.write(meta)
+        f.write(serialized_engine)
+    return engine_path
@@ -23,8 +23,8 @@ import json
 import os
 import sys
 
-# Import custom modules
-from vehicle_detector import VehicleDetector
+# Import custom modules. The detector modules are imported in main(), so only the
+# selected backend's dependencies (PyTorch or just OpenCV) get loaded.
 from traffic_manager import TrafficManager
 from simulation_gui import SimulationGUI
 from arduino import ArduinoConnector
@@ -49,6 +49,13 @@ def main():
         default=os.path.join('test_images', '1.jpg'),
         help="Path to the intersection image to be analyzed for vehicle detection."
     )
+    parser.add_argument(
+        '--detector',
+        choices=['ultralytics', 'darknet'],
+        default='ultralytics',
+        help="Detection backend: YOLOv8 via Ultralytics, or the lightweight YOLOv2 Darknet "
+             "model via OpenCV DNN."
+    )
     args = parser.parse_args()
 
     # Set default vehicle counts. These are used if detection is disabled.
@@ -59,9 +66,15 @@ def main():
         print("--- Vehicle Detection Mode Enabled ---")
 
         # Pre-flight checks for necessary files
-        if not os.path.exists(config.MODEL_WEIGHTS):
+        if args.detector == 'darknet':
+            weights_path = config.DARKNET_WEIGHTS
+            weights_hint = "'yolov2.weights' (approx. 200MB) from an official source"
+        else:
+            weights_path = config.MODEL_WEIGHTS
+            weights_hint = "'yolov8n.pt' (approx. 6MB) from the Ultralytics releases"
+        if not os.path.exists(weights_path):
             print("\n[FATAL ERROR] Model weights file not found!")
-            print(f"Please download 'yolov2.weights' (approx. 200MB) from an official source")
+            print(f"Please download {weights_hint}")
             print(f"and place it in the '{os.path.join(config.BASE_DIR, 'bin')}' directory.")
             sys.exit(1) # Exit if critical files are missing
 
@@ -71,8 +84,18 @@ def main():
 
         # Initialize and run the detector
         print("Initializing vehicle detector... (This may take a moment)")
-        detector = VehicleDetector()
-        vehicle_counts = detector.detect_vehicles(args.image_path)
+        if args.detector == 'darknet':
+            from darknet_detector import DarknetVehicleDetector
+            detector = DarknetVehicleDetector()
+        else:
+            from vehicle_detector import get_detector
+            detector = get_detector()
+        try:
+            vehicle_counts = detector.detect_vehicles(args.image_path)
+        except Exception as e:
+            # Keep the simulation usable if the model fails; it just starts with empty lanes.
+            print(f"[ERROR] Vehicle detection failed on '{args.image_path}': {e}")
+            vehicle_counts = {'right': 0, 'left': 0, 'up': 0, 'down': 0}
 
         print("\n--- Detection Complete ---")
         print("Detected Vehicle Counts:")
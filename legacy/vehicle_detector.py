@@ -4,23 +4,124 @@ Vehicle Detector Module
 =========================================================================================
 Purpose:
 This module contains the VehicleDetector class, which is responsible for using a
-pre-trained YOLOv2 model to detect and count vehicles in a given image of an
+pre-trained YOLOv8 model to detect and count vehicles in a given image of an
 intersection. The logic is designed to be robust and provides clear feedback.
 
-Technology Note on 'darkflow':
-This project uses 'darkflow', a library that translates Darknet's YOLO models to
-TensorFlow. It was primarily built for TensorFlow 1.x. Migrating this to a more
-modern framework (like TensorFlow 2.x, PyTorch, or using a library like Ultralytics'
-YOLOv5/v8) would be a significant but valuable upgrade for performance, ease of use,
-and future compatibility.
+Technology Note on TensorRT:
+The detector originally ran YOLOv2 through 'darkflow', a TensorFlow 1.x port of
+Darknet. It now uses Ultralytics YOLO. On machines with a CUDA GPU the model is
+exported once to a TensorRT engine, which fuses layers and runs on Tensor Cores,
+and the engine file is reused on every later run. The engine is INT8 when calibration
+frames are available (see int8_calibration.py) and FP16 otherwise. Without a GPU the
+model is exported to OpenVINO instead, when it is installed.
 =========================================================================================
 """
 
+import gc
+import importlib.util
+import os
+import re
+import threading
 import cv2
 import json
-from darkflow.net.build import TFNet
+import numpy as np
+import torch
+import torch.nn.functional as F
+import torchvision.io
+from torchvision.io import ImageReadMode
+from ultralytics import YOLO
+from ultralytics.nn.autobackend import AutoBackend
+from ultralytics.utils import ops
 import config  # Imports settings from the central configuration file
 
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # numba is optional; count_quadrants then uses the NumPy implementation below
+    HAVE_NUMBA = False
+
+# Lane for each image quadrant, indexed by the quadrant id computed in _count_lanes:
+# bit 0 is set for the right half of the image and bit 1 for the bottom half.
+# This assumes a top-down or angled view of a standard intersection.
+LANE_BY_QUADRANT = ('up', 'right', 'left', 'down')
+
+# COCO class ids of the vehicle types we are interested in: bicycle (1), car (2),
+# motorcycle (3), bus (5) and truck (7).
+VEHICLE_CLASS_IDS = (1, 2, 3, 5, 7)
+
+# Input shapes are fixed (config.IMGSZ), so let cuDNN benchmark and keep the fastest
+# convolution algorithm for them.
+torch.backends.cudnn.benchmark = True
+
+if HAVE_NUMBA:
+    # Compiled eagerly for the exact argument types used by _count_lanes and cached to
+    # disk, so neither the first frame nor a fresh process pays for compilation.
+    @njit('int32[:](float32[:, :], int64[:], int64, int64, int64)', cache=True)
+    def count_quadrants(boxes, class_ids, vehicle_mask, width, height):
+        """
+        Counts the vehicle boxes (class bit set in vehicle_mask) in each image quadrant,
+        indexed like LANE_BY_QUADRANT.
+        """
+        counts = np.zeros(4, dtype=np.int32)
+        for i in range(boxes.shape[0]):
+            # Shifting by 64 or more is undefined in machine code, so check the range.
+            if class_ids[i] < 64 and (vehicle_mask >> class_ids[i]) & 1:
+                quadrant = 0
+                if boxes[i, 0] + boxes[i, 2] >= width:
+                    quadrant += 1
+                if boxes[i, 1] + boxes[i, 3] >= height:
+                    quadrant += 2
+                counts[quadrant] += 1
+        return counts
+else:
+    def count_quadrants(boxes, class_ids, vehicle_mask, width, height):
+        """
+        Counts the vehicle boxes (class bit set in vehicle_mask) in each image quadrant,
+        indexed like LANE_BY_QUADRANT.
+        """
+        # Keep only the boxes whose class is one of our vehicle types. Shifts past the
+        # mask's highest bit yield 0, so every other class id is dropped.
+        boxes = boxes[((vehicle_mask >> class_ids) & 1).astype(bool)]
+
+        # center_x >= width / 2 is the same test as x1 + x2 >= width, and likewise for y.
+        quadrant = (boxes[:, 0] + boxes[:, 2] >= width).astype(np.intp)
+        quadrant += 2 * (boxes[:, 1] + boxes[:, 3] >= height)
+        return np.bincount(quadrant, minlength=4).astype(np.int32)
+
+
+def lane_counts_to_dict(counts):
+    """
+    Converts a lane counts array (indexed like LANE_BY_QUADRANT) into the
+    {'up': n, 'right': n, 'left': n, 'down': n} dictionary returned by the public API.
+    """
+    return dict(zip(LANE_BY_QUADRANT, counts.tolist()))
+
+
+class Letterbox(torch.nn.Module):
+    """
+    GPU preprocessing for one input resolution: BGR HWC uint8 -> RGB CHW float in 0-1,
+    resized to fit IMGSZ x IMGSZ with the aspect ratio kept and padded evenly with
+    Ultralytics' gray (114).
+
+    The sizes are fixed per instance so the module can be traced once with TorchScript,
+    which lets the JIT fuser merge the elementwise steps into fewer kernels.
+    """
+
+    def __init__(self, height, width, imgsz):
+        super().__init__()
+        scale = imgsz / max(height, width)
+        self.size = (round(height * scale), round(width * scale))
+        new_h, new_w = self.size
+        top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+        self.padding = (left, imgsz - new_w - left, top, imgsz - new_h - top)
+
+    def forward(self, frame):
+        image = frame.permute(2, 0, 1).flip(0).unsqueeze(0).float() * (1 / 255.0)
+        image = F.interpolate(image, size=self.size, mode='bilinear', align_corners=False)
+        return F.pad(image, self.padding, value=114 / 255.0)
+
+
 class VehicleDetector:
     """
     A class to detect vehicles in an image using a pre-trained YOLO model.
@@ -30,26 +131,155 @@ class VehicleDetector:
 
     def __init__(self):
         """
-        Initializes the VehicleDetector by loading the YOLOv2 model.
+        Initializes the VehicleDetector by loading the YOLO model.
         This is an expensive operation and should only be done once per session.
         """
-        # Define the model configuration dictionary, pulling settings from the config file.
+        # With a CUDA GPU, frames are preprocessed on the GPU (see _preprocess) so only
+        # the raw uint8 frame crosses the PCIe bus.
+        self.device = torch.device('cuda:0') if torch.cuda.is_available() else None
+        if self.device is not None:
+            # Traced Letterbox modules, one per camera resolution (see _letterbox_for).
+            self._letterboxes = {}
+            # Host frames are uploaded on their own stream through one reusable pinned
+            # (page-locked) buffer per frame shape (see _to_device).
+            self._copy_stream = torch.cuda.Stream(self.device)
+            self._staging = {}
+
+        # Load the model (or its TensorRT engine) using the paths from the config file.
         # This makes the detector independent of hardcoded paths.
-        options = {
-            "model": config.MODEL_CFG,
-            "load": config.MODEL_WEIGHTS,
-            "threshold": config.DETECTION_THRESHOLD,
-            "gpu": 0.7  # Allocate 70% of GPU memory if available. Set to 0.0 for CPU-only.
-        }
-
-        # Load the TensorFlow model using Darkflow's TFNet class.
         print("Loading vehicle detection model into memory...")
-        self.tfnet = TFNet(options)
+        self.use_amp = False
+        self.max_batch = None
+        self.model = self._load_model()
         print("Model loaded successfully.")
 
-        # Define the set of vehicle labels we are interested in. Using a set provides
-        # fast O(1) average time complexity for checking if a detected label is a vehicle.
-        self.vehicle_labels = {'car', 'bus', 'truck', 'motorbike', 'bicycle'}
+        # Bitmask with one bit set per vehicle class id. Testing a detection is then a
+        # shift and an AND on its integer class id, instead of a label string lookup.
+        self.vehicle_mask = sum(1 << class_id for class_id in VEHICLE_CLASS_IDS)
+
+        if self.device is not None:
+            # A few forward passes at the exact input shape, so cuDNN/TensorRT kernel
+            # selection and memory allocation happen now and not on the first real frame.
+            blank_frame = np.zeros((config.IMGSZ, config.IMGSZ, 3), dtype=np.uint8)
+            for _ in range(3):
+                self._predict(self._preprocess([blank_frame]))
+
+    def _load_model(self):
+        """
+        Loads the YOLO model, preferring a TensorRT engine when a CUDA GPU is available.
+
+        If no engine can be loaded or built (e.g. TensorRT is not installed), the PyTorch
+        model runs on the GPU instead, in channels_last layout under FP16 autocast so
+        cuDNN can still use its Tensor Core kernels. CPU-only machines use OpenVINO.
+
+        On the GPU the model is loaded as a bare Ultralytics AutoBackend, so _predict can
+        run it and NMS directly on the preprocessed GPU batch.
+
+        Returns:
+            YOLO | AutoBackend: The loaded YOLO model on CPU-only machines, or the
+                                AutoBackend on a CUDA GPU.
+        """
+        if self.device is None:
+            return self._load_openvino()
+
+        try:
+            return self._load_backend(self._load_engine())
+        except Exception as e:
+            print(f"[WARNING] Could not load a TensorRT engine ({e}). Using PyTorch on the GPU.")
+            # _load_engine may have failed after setting the engine's batch limit; the
+            # PyTorch model takes any batch size.
+            self.max_batch = None
+
+        # The weights stay NCHW because Ultralytics' conv+BN fusing needs them that way;
+        # the channels_last input from _preprocess switches the convolutions to NHWC.
+        self.use_amp = True
+        return self._load_backend(config.MODEL_WEIGHTS)
+
+    def _load_backend(self, weights_path):
+        """Loads weights or an engine file onto the GPU as a fused, eval-mode AutoBackend."""
+        backend = AutoBackend(weights_path, device=self.device, fuse=True, verbose=False)
+        return backend.eval()
+
+    def _load_openvino(self):
+        """
+        Loads the OpenVINO version of config.MODEL_WEIGHTS for CPU-only machines.
+
+        OpenVINO fuses the graph and runs it on oneDNN's AVX2/AVX-512 kernels, which is
+        typically 2-3x faster than PyTorch on x86 CPUs. The model is exported on the
+        first run and saved next to the weights, with a fixed batch size of 1. If
+        OpenVINO is not installed, the PyTorch model is used as is.
+
+        Returns:
+            YOLO: The loaded Ultralytics model.
+        """
+        if importlib.util.find_spec('openvino') is None:
+            return YOLO(config.MODEL_WEIGHTS)
+
+        model_dir = os.path.splitext(config.MODEL_WEIGHTS)[0] + '_openvino_model'
+        if not os.path.isdir(model_dir):
+            print("Exporting OpenVINO model (one-time step)...")
+            model_dir = YOLO(config.MODEL_WEIGHTS).export(
+                format='openvino', half=True, imgsz=config.IMGSZ
+            )
+        # The export has a static batch of 1, so batches run one frame at a time
+        # (see _predict).
+        self.max_batch = 1
+        return YOLO(model_dir, task='detect')
+
+    def _load_engine(self):
+        """
+        Finds the TensorRT engine for config.MODEL_WEIGHTS, building it if needed.
+
+        Engines are specialized to one input shape (batch 1, IMGSZ x IMGSZ) and are only
+        valid on the GPU model they were built on, so each engine file is keyed by GPU
+        name, input size and precision. It is built on the first run and saved next to
+        the weights, so later runs skip the (slow) build step. An INT8 engine is used
+        when calibration data is available (see int8_calibration); otherwise, or if the
+        INT8 build fails, the detector falls back to an FP16 engine.
+
+        Returns:
+            str: The path of the engine file, ready to load.
+        """
+        # Fixed-shape engines take exactly one frame per forward pass (see _predict).
+        self.max_batch = 1
+
+        int8_engine_path = self._engine_path('int8')
+        has_calibration_data = os.path.exists(config.CALIBRATION_CACHE) or (
+            os.path.isdir(config.CALIBRATION_DIR) and os.listdir(config.CALIBRATION_DIR)
+        )
+        if not os.path.exists(int8_engine_path) and has_calibration_data:
+            try:
+                # Imported here so machines without TensorRT never need it for the FP16 path.
+                from int8_calibration import build_int8_engine
+
+                print("Building INT8 TensorRT engine (one-time step, this can take several minutes)...")
+                build_int8_engine(
+                    config.MODEL_WEIGHTS, int8_engine_path, config.CALIBRATION_DIR,
+                    config.IMGSZ, config.CALIBRATION_CACHE
+                )
+            except Exception as e:
+                # e.g. onnx missing or a failed calibration; FP16 needs neither.
+                print(f"[WARNING] Could not build the INT8 engine ({e}). Using FP16 instead.")
+        if os.path.exists(int8_engine_path):
+            return int8_engine_path
+
+        engine_path = self._engine_path('fp16')
+        if not os.path.exists(engine_path):
+            print("Building TensorRT engine (one-time step, this can take several minutes)...")
+            exported_path = YOLO(config.MODEL_WEIGHTS).export(
+                format='engine', imgsz=config.IMGSZ, dynamic=False, batch=1, half=True, device=0
+            )
+            os.replace(exported_path, engine_path)
+        return engine_path
+
+    def _engine_path(self, precision):
+        """
+        Returns the engine file for this GPU, input size and precision ('fp16' or 'int8'),
+        e.g. bin/yolov8n_NVIDIA_GeForce_RTX_3080_640_fp16.engine.
+        """
+        gpu_name = re.sub(r'\W+', '_', torch.cuda.get_device_name(self.device))
+        weights_stem = os.path.splitext(config.MODEL_WEIGHTS)[0]
+        return f"{weights_stem}_{gpu_name}_{config.IMGSZ}_{precision}.engine"
 
     def detect_vehicles(self, image_path):
         """
@@ -60,62 +290,305 @@ class VehicleDetector:
 
         Returns:
             dict: A dictionary containing the vehicle count for each of the four lanes
-                  ('right', 'left', 'up', 'down'). Returns zero counts on failure.
+                  ('right', 'left', 'up', 'down'). Returns zero counts if the image
+                  cannot be read; model errors propagate to the caller.
         """
-        try:
-            # Read the image using OpenCV.
-            image = cv2.imread(image_path)
+        return lane_counts_to_dict(self.detect_vehicles_array(image_path))
+
+    def detect_vehicles_array(self, image_path):
+        """
+        Same as detect_vehicles, but returns the counts as an array instead of a dict,
+        for callers that process many frames and do not need lane names.
+
+        Args:
+            image_path (str): The full path to the image file to be processed.
+
+        Returns:
+            np.ndarray: The int32 vehicle count per lane, indexed like LANE_BY_QUADRANT
+                        ('up', 'right', 'left', 'down').
+        """
+        # Read the image (decoded on the GPU when possible, see _read_image).
+        image = self._read_image(image_path)
+        if image is None:
+            print(f"[ERROR] Image not found or could not be read at path: {image_path}")
+            return np.zeros(4, dtype=np.int32)
+        return self._count_frame(image)
+
+    def detect_vehicles_frame(self, frame):
+        """
+        Detects and counts vehicles in a frame that is already in memory, e.g. one grabbed
+        from a camera stream, without writing it to disk and decoding it again.
+
+        Args:
+            frame (np.ndarray): A BGR uint8 image, as returned by cv2.imread or
+                                cv2.VideoCapture.read.
+
+        Returns:
+            dict: A dictionary containing the vehicle count for each of the four lanes
+                  ('right', 'left', 'up', 'down').
+
+        Model errors are not caught here; they propagate so the caller can log them with
+        its own context and decide whether to retry.
+        """
+        return lane_counts_to_dict(self._count_frame(frame))
+
+    def detect_vehicles_batch(self, image_paths):
+        """
+        Detects and counts vehicles in several images (e.g. one per intersection camera)
+        with a single forward pass of the model.
+
+        Args:
+            image_paths (list[str]): Paths of the image files to be processed.
+
+        Returns:
+            list[dict]: One lane-count dictionary per input path, in the same order.
+                        Images that cannot be read get zero counts; model errors
+                        propagate to the caller.
+        """
+        # One row of lane counts per input, filled in for the images that can be read.
+        vehicle_counts = np.zeros((len(image_paths), 4), dtype=np.int32)
+
+        # Read every image, remembering which inputs could actually be decoded.
+        images, positions = [], []
+        for position, image_path in enumerate(image_paths):
+            image = self._read_image(image_path)
             if image is None:
-                # If the image cannot be read, raise a specific error.
-                raise FileNotFoundError(f"Image not found or could not be read at path: {image_path}")
-
-            # Get image dimensions to define regions of interest (ROIs).
-            height, width, _ = image.shape
-
-            # Use the loaded model to get a list of predictions from the image.
-            predictions = self.tfnet.return_predict(image)
-
-            # Define the four quadrants of the image as ROIs for each traffic lane.
-            # This logic assumes a top-down or angled view of a standard intersection.
-            # Format: (x_start, y_start, x_end, y_end)
-            rois = {
-                'right': (width // 2, 0, width, height // 2),
-                'down': (width // 2, height // 2, width, height),
-                'left': (0, height // 2, width // 2, height),
-                'up': (0, 0, width // 2, height // 2)
-            }
-
-            # Initialize a dictionary to store the count of vehicles in each lane.
-            vehicle_counts = {lane: 0 for lane in rois.keys()}
-
-            # Iterate through each prediction returned by the model.
-            for prediction in predictions:
-                label = prediction['label']
-
-                # Check if the detected object's label is in our set of vehicle types.
-                if label in self.vehicle_labels:
-                    # Get the bounding box coordinates.
-                    top_left = prediction['topleft']
-                    bottom_right = prediction['bottomright']
-
-                    # Calculate the center point of the bounding box. This point is used
-                    # to determine which ROI (lane) the vehicle belongs to.
-                    center_x = (top_left['x'] + bottom_right['x']) / 2
-                    center_y = (top_left['y'] + bottom_right['y']) / 2
-
-                    # Check which ROI the center point falls into.
-                    for lane, (x1, y1, x2, y2) in rois.items():
-                        if x1 < center_x < x2 and y1 < center_y < y2:
-                            vehicle_counts[lane] += 1
-                            break  # Vehicle is assigned, move to the next prediction.
-
-            return vehicle_counts
+                print(f"[ERROR] Image not found or could not be read at path: {image_path}")
+                continue
+            images.append(image)
+            positions.append(position)
 
-        except Exception as e:
-            # Catch any other exceptions during the process (e.g., model errors).
-            print(f"[ERROR] An unexpected error occurred during vehicle detection: {e}")
-            # Return a default zero-count dictionary to prevent the application from crashing.
-            return {'right': 0, 'left': 0, 'up': 0, 'down': 0}
+        if images:
+            # Passing the list in one call batches all frames into one forward pass.
+            vehicle_counts[positions] = self._count_frames(images)
+        return [lane_counts_to_dict(counts) for counts in vehicle_counts]
+
+    def _count_frame(self, frame):
+        """Runs the model on one frame and returns its lane counts array."""
+        return self._count_frames([frame])[0]
+
+    def _count_frames(self, images):
+        """Runs the model on BGR frames and returns their lane counts as an (N, 4) int32 array."""
+        # Use the loaded model to get the predictions for the images. Boxes below the
+        # confidence threshold are already dropped by the model.
+        detections = self._predict(self._preprocess(images))
+        if self.device is None:
+            shapes = [image.shape[:2] for image in images]
+        else:
+            # GPU boxes stay in model input coordinates. The letterbox padding is
+            # centered, so the input center is the image center (see _preprocess).
+            shapes = [(config.IMGSZ, config.IMGSZ)] * len(images)
+        return np.stack([
+            self._count_lanes(frame_detections, height, width)
+            for frame_detections, (height, width) in zip(detections, shapes)
+        ])
+
+    def _read_image(self, image_path):
+        """
+        Reads an image file as a BGR frame.
+
+        On a CUDA machine JPEGs are decoded on the GPU with nvJPEG (torchvision), so the
+        CPU never touches the pixels and only the compressed bytes are uploaded. Other
+        formats, JPEGs that nvJPEG cannot decode, and CPU-only machines use cv2.imread.
+
+        Args:
+            image_path (str): The full path to the image file.
+
+        Returns:
+            torch.Tensor | np.ndarray | None: An HWC BGR uint8 frame (a view of the
+                                              decoded image when on the GPU), or None if
+                                              the file cannot be read.
+        """
+        if self.device is None or not image_path.lower().endswith(('.jpg', '.jpeg')):
+            return cv2.imread(image_path)
+        try:
+            data = torchvision.io.read_file(image_path)
+            # RGB mode also converts grayscale and CMYK JPEGs to three channels.
+            image = torchvision.io.decode_jpeg(data, mode=ImageReadMode.RGB, device=self.device)
+        except RuntimeError:
+            # Missing file, or a JPEG nvJPEG cannot decode (e.g. progressive or
+            # lossless); cv2.imread handles the latter and returns None for the former.
+            return cv2.imread(image_path)
+        # decode_jpeg returns CHW RGB; present it as HWC BGR like cv2.imread does.
+        return image.flip(0).permute(1, 2, 0)
+
+    def _predict(self, source):
+        """
+        Runs the model on preprocessed input.
+
+        Only vehicle classes above the confidence threshold come out of the model: the
+        class filter runs inside NMS, and class-agnostic NMS also merges overlapping
+        boxes of different vehicle classes (e.g. car and truck) into one detection.
+
+        On a CUDA GPU the forward pass and NMS both run on the device batch, so the
+        frames are never copied back to the host; only the detections are. On the
+        PyTorch GPU fallback the forward pass runs in FP16 under autocast. Input larger
+        than the model's fixed batch size is run in chunks.
+
+        Returns:
+            list[torch.Tensor]: One (n, 6) tensor per frame with a row of (x1, y1, x2, y2,
+                                confidence, class id) per detection, in original image
+                                coordinates on the CPU and in model input coordinates
+                                on the GPU.
+        """
+        if self.max_batch is not None and len(source) > self.max_batch:
+            return [
+                result
+                for start in range(0, len(source), self.max_batch)
+                for result in self._predict(source[start:start + self.max_batch])
+            ]
+        if self.device is None:
+            results = self.model(
+                source, imgsz=config.IMGSZ, conf=config.DETECTION_THRESHOLD,
+                iou=config.NMS_IOU_THRESHOLD, classes=list(VEHICLE_CLASS_IDS), agnostic_nms=True,
+                max_det=config.MAX_DETECTIONS, verbose=False
+            )
+            return [result.boxes.data for result in results]
+
+        with torch.inference_mode():
+            with torch.autocast('cuda', dtype=torch.float16, enabled=self.use_amp):
+                predictions = self.model(source)
+            return ops.non_max_suppression(
+                predictions, config.DETECTION_THRESHOLD, config.NMS_IOU_THRESHOLD,
+                classes=list(VEHICLE_CLASS_IDS), agnostic=True, max_det=config.MAX_DETECTIONS
+            )
+
+    def _preprocess(self, images):
+        """
+        Prepares BGR frames for the model.
+
+        On a CUDA machine each uint8 frame is uploaded once, and the conversion to RGB,
+        CHW layout, 0-1 scaling and letterbox resize to config.IMGSZ all run on the GPU.
+        The padding is centered, so the image center (and with it every lane quadrant)
+        stays at the center of the model input. Without a GPU the frames are returned
+        unchanged and Ultralytics preprocesses them on the CPU.
+
+        Args:
+            images (list[np.ndarray | torch.Tensor]): BGR frames as read by cv2.imread,
+                                                      or already on the GPU (see
+                                                      _read_image).
+
+        Returns:
+            torch.Tensor | list[np.ndarray]: A (N, 3, IMGSZ, IMGSZ) float tensor on the
+                                             GPU, or the input list on CPU-only machines.
+        """
+        if self.device is None:
+            return images
+
+        imgsz = config.IMGSZ
+        batch = torch.empty((len(images), 3, imgsz, imgsz), dtype=torch.float32, device=self.device)
+        for i, image in enumerate(images):
+            frame = self._to_device(image)
+            batch[i] = self._letterbox_for(frame)(frame)[0]
+
+        if self.use_amp:
+            # NHWC input makes the PyTorch model's convolutions run channels_last too.
+            # TensorRT engines need the plain NCHW layout.
+            batch = batch.contiguous(memory_format=torch.channels_last)
+        return batch
+
+    def _letterbox_for(self, frame):
+        """
+        Returns the TorchScript Letterbox for the frame's resolution, tracing it on first use.
+
+        Cameras have a fixed resolution, so in practice this traces once per camera type.
+        """
+        letterbox = self._letterboxes.get(frame.shape)
+        if letterbox is None:
+            height, width = frame.shape[:2]
+            with torch.no_grad():
+                letterbox = torch.jit.freeze(
+                    torch.jit.trace(Letterbox(height, width, config.IMGSZ).eval(), frame)
+                )
+            self._letterboxes[frame.shape] = letterbox
+        return letterbox
+
+    def _to_device(self, image):
+        """
+        Returns a GPU frame as is, or uploads a host frame to the GPU.
+
+        Copies from pageable memory (like a plain NumPy array) block the CPU, so the
+        frame is first copied into a pinned staging buffer, allocated once per frame
+        shape and reused afterwards. The upload is then queued on the copy stream, where
+        it overlaps the GPU work on the previous frame, and the compute stream waits for
+        it on the GPU rather than on the CPU.
+        """
+        if isinstance(image, torch.Tensor):
+            return image
+
+        staging, upload_done = self._staging.get(image.shape, (None, None))
+        if staging is None:
+            staging = torch.empty(image.shape, dtype=torch.uint8, pin_memory=True)
+            upload_done = torch.cuda.Event()
+            self._staging[image.shape] = (staging, upload_done)
+        else:
+            # The buffer may still be feeding the previous upload of this shape.
+            upload_done.synchronize()
+        staging.numpy()[...] = image
+
+        with torch.cuda.stream(self._copy_stream):
+            frame = staging.to(self.device, non_blocking=True)
+            upload_done.record(self._copy_stream)
+        current_stream = torch.cuda.current_stream(self.device)
+        current_stream.wait_event(upload_done)
+        # The frame was allocated on the copy stream; keep its memory alive until the
+        # compute stream is done with it.
+        frame.record_stream(current_stream)
+        return frame
+
+    def _count_lanes(self, detections, height, width):
+        """
+        Counts the vehicles in each lane for one image's detections.
+
+        Args:
+            detections (torch.Tensor): The (n, 6) detections for one image (see _predict).
+            height (int): Height of the image the box coordinates refer to.
+            width (int): Width of the image the box coordinates refer to.
+
+        Returns:
+            np.ndarray: The int32 vehicle count per lane, indexed like LANE_BY_QUADRANT.
+        """
+        # One small device-to-host copy of the detections. FP16 inference returns
+        # half-precision boxes; the kernel expects float32.
+        detections = detections.cpu().numpy().astype(np.float32, copy=False)
+        boxes = detections[:, :4]
+        class_ids = detections[:, 5].astype(np.int64)
+
+        # The center point of each vehicle's bounding box decides which lane it belongs
+        # to. The four lanes are the four quadrants of the image, so the lane is just
+        # two comparisons against the image center (see count_quadrants).
+        return count_quadrants(boxes, class_ids, self.vehicle_mask, width, height)
+
+
+# The process-wide detector returned by get_detector, and the lock guarding its creation.
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_detector():
+    """
+    Returns the process-wide VehicleDetector, creating it on first use.
+
+    Loading the model takes seconds, so callers (request handlers, camera threads)
+    should share one instance instead of constructing their own. In a pre-forking
+    server, call this once in the parent before the workers fork so they share the
+    model's memory pages copy-on-write.
+
+    Returns:
+        VehicleDetector: The shared detector.
+    """
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            # Checked again under the lock, in case another thread created it first.
+            if _detector is None:
+                detector = VehicleDetector()
+                # Move everything allocated so far (mostly the model) out of the GC's
+                # tracked generations, so collections neither scan it nor touch its
+                # pages, which would undo the copy-on-write sharing after a fork.
+                gc.freeze()
+                _detector = detector
+    return _detector
 
 # This block allows the script to be run directly for testing purposes.
 if __name__ == '__main__':
@@ -132,10 +605,10 @@ if __name__ == '__main__':
 
     # Check for necessary files before proceeding
     if not os.path.exists(config.MODEL_WEIGHTS) or not os.path.exists(args.image_path):
-         print("[FATAL ERROR] Ensure yolov2.weights is in the /bin folder and the image path is correct.")
+         print("[FATAL ERROR] Ensure yolov8n.pt is in the /bin folder and the image path is correct.")
     else:
         # Create a detector instance and run detection.
-        detector = VehicleDetector()
+        detector = get_detector()
         counts = detector.detect_vehicles(args.image_path)
 
         # Print the results in a clean, human-readable JSON format.